@@ -11,6 +11,8 @@ class Config:
     MAX_AUTONOMOUS_TURNS = int(os.getenv("MAX_AUTONOMOUS_TURNS", "30"))
     LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.1"))
     DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+    # Store session snapshots zstd-compressed (requires the optional zstandard package)
+    SESSION_ZSTD = os.getenv("SESSION_ZSTD", "false").lower() == "true"
 
     @classmethod
     def validate(cls):
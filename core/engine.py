@@ -13,6 +13,7 @@ from core.prompts import get_system_prompt
 from core.task import TaskManager
 from core.config import Config
 from tools.base import registry
+from tools.todo import bind_task_manager
 
 from rich.panel import Panel
 from rich.syntax import Syntax
@@ -121,6 +122,9 @@ class AgentEngine:
              
         self.memory.set_system_prompt(full_system_prompt)
         
+        # 绑定到当前 Task 的上下文，gather 创建的消费者任务会继承该绑定
+        bind_task_manager(self.task_manager)
+
         # Signal that initialization is complete
         self.ready_event.set()
         
@@ -17,7 +17,8 @@ class StreamHandler:
             logger.warning("MODELSCOPE_API_KEY 未配置，无法调用 ModelScope API")
         else:
             self.client = OpenAI(base_url="https://api-inference.modelscope.cn/v1", api_key=Config.MODELSCOPE_API_KEY)
-        self.executor = ThreadPoolExecutor(max_workers=1)
+        # Two workers: the main loop's stream plus a background AU2 compression stream
+        self.executor = ThreadPoolExecutor(max_workers=2)
 
     async def chat(self, messages, tools):
         """Async wrapper for ModelScope streaming chat."""
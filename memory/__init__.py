@@ -1,3 +1,4 @@
+import asyncio
 from typing import List, Dict, Any, Optional
 from utils.logger import logger, console
 from core.stream import StreamHandler
@@ -8,6 +9,9 @@ from memory.medium_term import MediumTermMemory
 from memory.long_term import LongTermMemory
 from memory.session_store import SessionStore
 
+# Recent messages left unmasked by the observation-masking fallback (matches AU2's recent window)
+MASK_KEEP_RECENT = 4
+
 class MemoryManager:
     """
     Facade for the 3-Tier Memory Architecture.
@@ -19,6 +23,9 @@ class MemoryManager:
         self.long_term = LongTermMemory()
         self.session_store = SessionStore()
         self.current_au2_summary = None # Cache for auto-save
+        # Background AU2 compression in flight, and the active-context tail it was started from
+        self._compress_task: Optional[asyncio.Task] = None
+        self._compress_base: tuple = (None, None)  # (snapshot context, its last message)
 
     async def initialize(self):
         """Lifecycle: Start -> Load Long Term Memory -> Check for Resume."""
@@ -77,6 +84,9 @@ class MemoryManager:
         Get context for LLM.
         Checks for overflow and runs compression if needed BEFORE returning context.
         """
+        # Turn boundary: swap in a background compression result if it has landed
+        await self._apply_finished_compression()
+
         try:
             # Check overflow logic is usually triggered on write, 
             # but we can also double check here or use the flag from write.
@@ -84,51 +94,102 @@ class MemoryManager:
         except MemoryOverflowError:
             logger.warning("Memory overflow detected. Applying Hybrid Memory Strategy...")
             
+            # Strategy 2: AU2 Compression (The "Smart" Approach)
+            # Scheduled from the full pre-truncation history - the only point where there
+            # is enough dialogue to summarize (compress() needs at least 10 messages).
+            # Runs in the background: this turn proceeds with the truncated context and
+            # the compressed one is swapped in at a later turn boundary.
+            active = self.short_term.active_context
+            if self._compress_task is None and len(active) >= 10:
+                logger.info("Hybrid Strategy: Scheduling AU2 Compression (background)...")
+                full_context = self.short_term.get_context()
+                self._compress_base = (full_context, active[-1])
+                self._compress_task = self.medium_term.start_compress(full_context)
+            
             # Strategy 1: FIFO Sliding Window (The "Safe" Approach)
-            # Use aggressive truncation to fit back into 80% of limit
+            # Use aggressive truncation to fit back into 80% of limit for this turn
             truncated = self.short_term.truncate_to_fit(target_ratio=0.8)
             
             if truncated:
                 logger.info(f"Hybrid Strategy: Truncated {len(truncated)} oldest messages to free space.")
-                
-                # Check if we are still overflowing? (truncate_to_fit guarantees we are under target, unless context is empty)
                 # We trigger Auto-Save to persist the truncation
                 await self.auto_save()
-                return self.short_term.get_context()
-
-            # Strategy 2: AU2 Compression (The "Smart" Approach) - Fallback
-            # Only reached if FIFO didn't work (e.g. context is empty but system prompt is huge? unlikely)
-            # or if we explicitly want to compress.
-            logger.info("Hybrid Strategy: Falling back to AU2 Compression...")
-            full_context = self.short_term.get_context()
-            
-            # Execute AU2
-            new_context, au2_data = await self.medium_term.compress(full_context)
-            
-            # Update Short Term with Compressed version
-            self.short_term.replace_context(new_context)
-            
-            # Update Medium Term Cache
-            if au2_data:
-                self.current_au2_summary = au2_data
-                
-            # Trigger Auto-Save immediately after compression
-            await self.auto_save()
-            
-            # Value Extraction: Check for Long-Term Insights
-            if au2_data:
-                await self._extract_value_to_long_term(au2_data)
             
         return self.short_term.get_context()
 
-    async def _extract_value_to_long_term(self, au2_data: Dict[str, Any]):
+    async def _apply_finished_compression(self):
+        """Splice a completed background AU2 result into short-term memory."""
+        task = self._compress_task
+        if task is None or not task.done():
+            return
+        self._compress_task = None
+
+        try:
+            new_context, au2_data = task.result()
+        except (asyncio.CancelledError, Exception) as e:
+            logger.error(f"Background compression failed: {e}")
+            return
+
+        snapshot, base_last = self._compress_base
+        self._compress_base = (None, None)
+        # compress() hands back its input untouched when it skipped the work or the
+        # compressor failed. Zero-LLM-cost fallback: mask old tool observations in the
+        # *current* (already truncated) context - that can only shrink it.
+        if new_context is snapshot:
+            active = self.short_term.active_context
+            if len(active) > MASK_KEEP_RECENT:
+                self.short_term.replace_context(
+                    self.medium_term._mask_observations(active[:-MASK_KEEP_RECENT]) + active[-MASK_KEEP_RECENT:]
+                )
+                await self.auto_save()
+            return
+
+        # The compressed snapshot replaces everything up to its last message (the older
+        # part may already be truncated away); messages added since are carried over.
+        # If that last message itself was truncated meanwhile, the result no longer lines up.
+        active = self.short_term.active_context
+        for idx in range(len(active) - 1, -1, -1):
+            if active[idx] is base_last:
+                break
+        else:
+            logger.info("AU2 result discarded: context changed during compression.")
+            return
+
+        # Never let a splice grow the context (e.g. a long intro outweighing what the
+        # FIFO truncation already freed) - that would just re-trigger the overflow.
+        spliced = new_context + active[idx + 1:]
+        new_active = [m for m in spliced if m.get("role") != "system"]
+        if self.short_term.estimate_messages(new_active) >= self.short_term.estimate_messages(active):
+            logger.info("AU2 result discarded: not smaller than the current context.")
+            return
+
+        # Update Short Term with Compressed version
+        self.short_term.replace_context(spliced)
+        
+        # Update Medium Term Cache
+        if au2_data:
+            self.current_au2_summary = au2_data
+            
+        # Trigger Auto-Save immediately after compression
+        await self.auto_save()
+        
+        # Value Extraction: Check for Long-Term Insights
+        if au2_data:
+            await self._extract_value_to_long_term(au2_data)
+
+    async def _extract_value_to_long_term(self, au2_data: Any):
         """
         Heuristic check: If AU2 summary contains explicit decisions or preferences,
         we might want to save them to MEMORY.md.
         Real implementation would use an LLM call to filter 'Global vs Local' info.
         For MVP, we just append 'Decisions' if they look significant.
         """
-        decisions = au2_data.get("decisions")
+        if isinstance(au2_data, str):
+            # AU2 returns Markdown: take the "## Key Decisions" section
+            _, _, tail = au2_data.partition("## Key Decisions")
+            decisions = tail.split("\n## ", 1)[0].strip()
+        else:
+            decisions = au2_data.get("decisions")
         if decisions and len(str(decisions)) > 10:
             # We invoke the Archivist
             # In a real agent, we'd ask: "Is this decision project-specific or global?"
@@ -4,6 +4,8 @@ from typing import List, Dict, Any, Optional
 from utils.logger import logger
 from core.stream import StreamHandler
 
+MASKED_OBSERVATION = "<MASKED: observation older than compression window>"
+
 class MediumTermMemory:
     """
     第二层：中期记忆 (The Compressor - AU2)
@@ -11,7 +13,58 @@ class MediumTermMemory:
     """
     def __init__(self, stream_handler: StreamHandler):
         self.stream_handler = stream_handler
-        self.is_compressing = False
+        self._lock = asyncio.Lock() # Single-flight guard: one AU2 call at a time
+        # (first msg, last msg, length, serialized middle), reused across rapid retries
+        self._middle_cache: tuple = (None, None, 0, "")
+
+    def _serialize_middle(self, middle: List[Dict[str, Any]]) -> str:
+        """JSON-dump the middle slice, skipping the work if it is unchanged since the last call."""
+        if not middle:
+            return "[]"
+        # The slice itself is a fresh list every time, but the message dicts are shared
+        # with ShortTermMemory, so the identity of its ends is a stable content key.
+        first, last, length, text = self._middle_cache
+        if middle[0] is first and middle[-1] is last and len(middle) == length:
+            return text
+        text = json.dumps(middle, ensure_ascii=False, indent=1)
+        self._middle_cache = (middle[0], middle[-1], len(middle), text)
+        return text
+
+    def start_compress(self, full_context: List[Dict[str, Any]]) -> asyncio.Task:
+        """
+        Launch compress() as a background task so the agent keeps working while
+        the compressor LLM responds. The task resolves to compress()'s result.
+        """
+        return asyncio.create_task(self.compress(full_context))
+
+    async def _collect_stream(self, stream_generator) -> str:
+        """Aggregate streamed text content without rendering it to the console."""
+        parts = []
+        async for chunk in stream_generator:
+            choices = getattr(chunk, "choices", None)
+            if not choices:
+                continue
+            content = getattr(choices[0].delta, "content", None)
+            if content:
+                parts.append(content)
+        return "".join(parts)
+
+    def _mask_observations(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Replace tool outputs and tool-call arguments with a placeholder.
+        Ids and names are kept so tool calls and results still pair up for the API.
+        """
+        masked = []
+        for m in messages:
+            if m['role'] == 'tool':
+                m = {**m, "content": MASKED_OBSERVATION}
+            elif m.get("tool_calls"):
+                m = {**m, "tool_calls": [
+                    {**tc, "function": {**tc["function"], "arguments": "{}"}}
+                    for tc in m["tool_calls"]
+                ]}
+            masked.append(m)
+        return masked
 
     async def compress(self, full_context: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
         """
@@ -21,28 +74,31 @@ class MediumTermMemory:
         # Feature Flag: If AU2 is disabled via config (implied), or we just want to skip it for stability
         # For now, we still allow it, but we add a guard.
         
-        if self.is_compressing or len(full_context) < 10:
+        if self._lock.locked() or len(full_context) < 10:
             return full_context, None
 
-        self.is_compressing = True
+        async with self._lock:
+            return await self._compress_locked(full_context)
+
+    async def _compress_locked(self, full_context: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
         logger.info("Starting AU2 Context Compression...")
         
         au2_data = None
 
-        try:
-            # 1. Slice Strategy: Keep System + First 2 (Intro) + Last 4 (Recent)
-            # Everything in between is "The Middle" to be compressed.
-            system_msgs = [m for m in full_context if m['role'] == 'system']
-            dialogue = [m for m in full_context if m['role'] != 'system']
-            
-            if len(dialogue) < 10:
-                return full_context
+        # 1. Slice Strategy: Keep System + First 2 (Intro) + Last 4 (Recent)
+        # Everything in between is "The Middle" to be compressed.
+        system_msgs = [m for m in full_context if m['role'] == 'system']
+        dialogue = [m for m in full_context if m['role'] != 'system']
+        
+        if len(dialogue) < 10:
+            return full_context, None
 
-            intro = dialogue[:2]
-            recent = dialogue[-4:]
-            middle = dialogue[2:-4]
-            
-            middle_text = json.dumps(middle, ensure_ascii=False, indent=1)
+        intro = dialogue[:2]
+        recent = dialogue[-4:]
+        middle = dialogue[2:-4]
+
+        try:
+            middle_text = self._serialize_middle(middle)
 
             # 2. AU2 Prompt Generation (Markdown Optimized)
             prompt = f"""
@@ -69,8 +125,13 @@ class MediumTermMemory:
             # 3. Call LLM for compression
             compress_msgs = [{"role": "user", "content": prompt}]
             
+            # Collected silently: this usually runs in the background next to the
+            # main loop's own streamed output (see start_compress).
             response_gen = self.stream_handler.chat(compress_msgs, tools=None)
-            compressed_str, _ = await self.stream_handler.render_stream(response_gen)
+            compressed_str = await self._collect_stream(response_gen)
+            if not compressed_str.strip():
+                # StreamHandler reports an exhausted retry budget as an empty stream
+                raise RuntimeError("compressor returned an empty summary")
             
             # 4. Use raw markdown directly
             au2_data = compressed_str # For session store
@@ -90,7 +151,8 @@ class MediumTermMemory:
             return new_context, au2_data
 
         except Exception as e:
-            logger.error(f"Compression failed: {e}")
+            # Hand the input back untouched: it is the full pre-truncation snapshot, so
+            # anything built from it would bring truncated messages back. The caller
+            # falls back to masking observations in its current context instead.
+            logger.error(f"Compression failed: {e}. Falling back to observation masking.")
             return full_context, None
-        finally:
-            self.is_compressing = False
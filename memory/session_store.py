@@ -1,36 +1,155 @@
+import io
 import json
 import os
-import glob
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import aiofiles
+from core.config import Config
 from utils.logger import logger
 
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+# Optional zstd snapshots (SESSION_ZSTD=true): a dictionary trained on prior
+# sessions captures the shared boilerplate (headers, role tags) of small files.
+ZSTD_DICT_FILE = ".zstd_dict"
+ZSTD_DICT_SIZE = 64_000
+ZSTD_TRAIN_MIN_SAMPLES = 20
+ZSTD_LEVEL = 3
+
+def _emit_messages(msgs: List[Dict], w) -> None:
+    """
+    Write the dialogue body of a session snapshot through the buffer writer `w`.
+    Specialized to the fixed message schema so the per-turn autosave loop does
+    no repeated case-folding or role re-derivation.
+    """
+    for msg in msgs:
+        role = msg.get("role", "unknown")
+        kind = role.lower()
+
+        # --- Smart Filtering (User Request) ---
+        # 只同步主要信息：User 的话，Assistant 的话。
+        # 过滤掉 Tool 的执行结果和 Tool Calls 的详细 JSON。
+
+        # 1. 忽略 Tool 的执行结果
+        if kind == "tool":
+            continue
+
+        content = msg.get("content", "")
+
+        # 2. 对于 Assistant 消息，只保留 content
+        # 如果 content 为空且只有 tool_calls，则跳过该消息（因为它没有实质性对话内容）
+        if kind == "assistant" and not content and "tool_calls" in msg:
+            continue
+
+        # 3. 不再保存 Tool Calls 详情
+        if content:
+            w(f"## {role.capitalize()}\n{content}\n\n\n".encode("utf-8"))
+        else:
+            w(f"## {role.capitalize()}\n\n\n".encode("utf-8"))
+
+
 class SessionStore:
     """
     Handles JSON serialization for Short-Term and Medium-Term memories.
     Path: memory/sessions/session_{timestamp}.json
     """
-    def __init__(self, session_dir="memory/sessions"):
+    def __init__(self, session_dir="memory/sessions", compress: Optional[bool] = None):
         self.session_dir = session_dir
         self.current_session_file = None
         self._ensure_dir()
 
+        if compress is None:
+            compress = Config.SESSION_ZSTD
+        if compress and zstd is None:
+            logger.warning("SESSION_ZSTD is set but zstandard is not installed. Sessions stay plain Markdown.")
+        self.compress = bool(compress) and zstd is not None
+        self._cctx = None
+        self._dctx = None
+        if self.compress:
+            self._init_zstd()
+
+    def _init_zstd(self):
+        """Load the persisted dictionary, or train one once enough sessions exist."""
+        dict_path = os.path.join(self.session_dir, ZSTD_DICT_FILE)
+        dict_data = None
+        if os.path.exists(dict_path):
+            with open(dict_path, "rb") as f:
+                dict_data = zstd.ZstdCompressionDict(f.read())
+        else:
+            samples = self._session_samples()
+            if len(samples) >= ZSTD_TRAIN_MIN_SAMPLES:
+                try:
+                    dict_data = zstd.train_dictionary(ZSTD_DICT_SIZE, samples)
+                    # Never retrained once written: existing snapshots depend on it.
+                    with open(dict_path, "wb") as f:
+                        f.write(dict_data.as_bytes())
+                    logger.info(f"Trained session dictionary from {len(samples)} sessions.")
+                except zstd.ZstdError as e:
+                    logger.warning(f"Session dictionary training failed: {e}")
+                    dict_data = None
+        self._cctx = zstd.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dict_data)
+        self._dctx = zstd.ZstdDecompressor(dict_data=dict_data)
+
+    def _session_samples(self) -> List[bytes]:
+        """Raw Markdown of existing sessions, used as dictionary training input."""
+        samples = []
+        plain_dctx = zstd.ZstdDecompressor()
+        with os.scandir(self.session_dir) as it:
+            for entry in it:
+                name = entry.name
+                if not name.startswith("session_"):
+                    continue
+                try:
+                    with open(entry.path, "rb") as f:
+                        data = f.read()
+                    if name.endswith(".md.zst"):
+                        # Only dictionary-less snapshots exist before training
+                        data = plain_dctx.decompress(data)
+                    elif not name.endswith(".md"):
+                        continue
+                except (OSError, zstd.ZstdError):
+                    continue
+                samples.append(data)
+        return samples
+
+    def _decompress(self, data: bytes) -> bytes:
+        if zstd is None:
+            raise RuntimeError("zstandard is required to read compressed sessions")
+        # Snapshots written before the dictionary was trained carry dict_id 0
+        if zstd.get_frame_parameters(data).dict_id and self._dctx is not None:
+            return self._dctx.decompress(data)
+        return zstd.ZstdDecompressor().decompress(data)
+
     def _ensure_dir(self):
         if not os.path.exists(self.session_dir):
             os.makedirs(self.session_dir)
 
     def create_new_session(self):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.current_session_file = os.path.join(self.session_dir, f"session_{timestamp}.md")
+        ext = ".md.zst" if self.compress else ".md"
+        self.current_session_file = os.path.join(self.session_dir, f"session_{timestamp}{ext}")
         logger.info(f"New session created: {self.current_session_file}")
 
     def get_latest_session(self) -> Optional[str]:
         """Find the most recent session file."""
-        files = glob.glob(os.path.join(self.session_dir, "session_*.md"))
-        if not files:
+        # One directory read; DirEntry caches the stat so there is no extra syscall per file.
+        latest = None
+        latest_ctime = -1.0
+        try:
+            with os.scandir(self.session_dir) as it:
+                for entry in it:
+                    name = entry.name
+                    if name.startswith("session_") and name.endswith((".md", ".md.zst")):
+                        ctime = entry.stat().st_ctime
+                        if ctime > latest_ctime:
+                            latest_ctime = ctime
+                            latest = entry.path
+        except OSError:
             return None
-        return max(files, key=os.path.getctime)
+        return latest
 
     async def save(self, messages: List[Dict], au2_summary: Optional[Dict] = None):
         """
@@ -52,18 +171,21 @@ class SessionStore:
 
         timestamp = datetime.now().isoformat()
         
-        # Prepare content
-        md_lines = ["---", f"timestamp: {timestamp}"]
+        # Prepare content: encode straight into one buffer instead of joining a line list
+        buf = io.BytesIO()
+        w = buf.write
+        w(b"---\n")
+        w(f"timestamp: {timestamp}\n".encode("utf-8"))
         
         if au2_summary:
             # We assume au2_summary is now a Markdown string or dict we convert
             if isinstance(au2_summary, str):
                 summary_str = au2_summary.replace("\n", "\\n") # Simple escape for YAML header
-                md_lines.append(f"au2_summary: {summary_str}")
+                w(f"au2_summary: {summary_str}\n".encode("utf-8"))
             else:
-                md_lines.append(f"au2_summary: {json.dumps(au2_summary)}")
+                w(f"au2_summary: {json.dumps(au2_summary)}\n".encode("utf-8"))
         
-        md_lines.append("---\n")
+        w(b"---\n\n")
         
         # Optimization: Only save the last N messages in detail if the session is huge
         # This prevents the markdown file from growing indefinitely.
@@ -85,55 +207,28 @@ class SessionStore:
              # Let's just safely slice the last 20.
              
              msgs_to_save = messages[-20:]
-             md_lines.append(f"<!-- Archived {len(messages)-20} older messages. See AU2 Summary for context. -->\n")
+             w(f"<!-- Archived {len(messages)-20} older messages. See AU2 Summary for context. -->\n\n".encode("utf-8"))
 
-        for msg in msgs_to_save:
-            role = msg.get("role", "unknown").capitalize()
-            content = msg.get("content", "")
-            
-            # --- Smart Filtering (User Request) ---
-            # 只同步主要信息：User 的话，Assistant 的话。
-            # 过滤掉 Tool 的执行结果和 Tool Calls 的详细 JSON。
-            
-            # 1. 忽略 Tool 的执行结果
-            if role.lower() == "tool":
-                continue
-                
-            # 2. 对于 Assistant 消息，只保留 content
-            # 如果 content 为空且只有 tool_calls，则跳过该消息（因为它没有实质性对话内容）
-            if role.lower() == "assistant":
-                if not content and "tool_calls" in msg:
-                    continue
-            
-            md_lines.append(f"## {role}")
-            
-            if content:
-                md_lines.append(str(content))
-            
-            # 3. 不再保存 Tool Calls 详情
-            # if "tool_calls" in msg and msg["tool_calls"]:
-            #     md_lines.append("\n```json:tool_calls")
-            #     md_lines.append(json.dumps(msg["tool_calls"], indent=2, ensure_ascii=False))
-            #     md_lines.append("```")
-                
-            # Serialize tool results (已在上面被过滤，这里注释掉以防万一)
-            # if role == "Tool":
-            #    if "name" in msg:
-            #        md_lines.append(f"\n**Tool Name**: {msg['name']}")
-                
-            md_lines.append("\n")
+        _emit_messages(msgs_to_save, w)
 
         try:
-            async with aiofiles.open(self.current_session_file, mode='w', encoding='utf-8') as f:
-                await f.write("\n".join(md_lines))
+            data = buf.getvalue()
+            if self.compress:
+                data = self._cctx.compress(data)
+            async with aiofiles.open(self.current_session_file, mode='wb') as f:
+                await f.write(data)
         except Exception as e:
             logger.error(f"Failed to auto-save session: {e}")
 
     async def load(self, file_path: str) -> Dict[str, Any]:
         """Load session data from Markdown file."""
         try:
-            async with aiofiles.open(file_path, mode='r', encoding='utf-8') as f:
-                content = await f.read()
+            if file_path.endswith(".zst"):
+                async with aiofiles.open(file_path, mode='rb') as f:
+                    content = self._decompress(await f.read()).decode('utf-8')
+            else:
+                async with aiofiles.open(file_path, mode='r', encoding='utf-8') as f:
+                    content = await f.read()
             
             # Simple parser for the specific MD format we write
             messages = []
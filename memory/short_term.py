@@ -3,6 +3,10 @@ from dataclasses import dataclass, field
 from core.config import Config
 from utils.logger import logger
 
+# add() only re-tokenizes after roughly this much new text (~500 tokens);
+# the 92% overflow threshold leaves ample slack in between.
+CHECK_INTERVAL_CHARS = 2000
+
 @dataclass
 class MemoryOverflowError(Exception):
     """Signal that short-term memory has exceeded capacity."""
@@ -18,6 +22,7 @@ class ShortTermMemory:
         self.active_context: List[Dict[str, Any]] = []
         self.system_prompt: Optional[Dict[str, Any]] = None
         self.token_limit = Config.MAX_HISTORY_TOKENS
+        self._chars_added_since_check = 0
         
         # Initialize Tokenizer
         try:
@@ -40,7 +45,9 @@ class ShortTermMemory:
         if name: msg["name"] = name
         
         self.active_context.append(msg)
-        self._check_overflow()
+        self._chars_added_since_check += len(str(content))
+        if self._chars_added_since_check > CHECK_INTERVAL_CHARS:
+            self._check_overflow()
 
     def get_context(self) -> List[Dict[str, Any]]:
         """Return System Prompt + Active Context."""
@@ -50,30 +57,45 @@ class ShortTermMemory:
         context.extend(self.active_context)
         return context
 
-    def _estimate_tokens(self) -> int:
-        """Estimate current token usage using tiktoken or fallback."""
-        text_content = ""
-        
-        # Collect all text content
-        if self.system_prompt:
-             text_content += str(self.system_prompt.get("content", ""))
-             
-        for msg in self.active_context:
-            text_content += str(msg.get("content", ""))
-            if msg.get("tool_calls"):
-                text_content += str(msg["tool_calls"])
-            if msg.get("name"):
-                text_content += str(msg["name"])
+    def _message_text(self, msg: Dict[str, Any]) -> str:
+        """Flatten the token-bearing fields of a single message."""
+        text = str(msg.get("content", ""))
+        if msg.get("tool_calls"):
+            text += str(msg["tool_calls"])
+        if msg.get("name"):
+            text += str(msg["name"])
+        return text
 
+    def _count_tokens(self, text: str) -> int:
+        """Count tokens of a text using tiktoken or fallback."""
         if self.use_tiktoken:
             try:
                 # Need to handle potential encoding errors with replacement
-                return len(self.tokenizer.encode(text_content, disallowed_special=()))
+                return len(self.tokenizer.encode(text, disallowed_special=()))
             except Exception as e:
                 logger.warning(f"tiktoken encoding failed: {e}. Fallback to char estimation.")
-                return int(len(text_content) / 3)
+                return int(len(text) / 3)
         else:
-            return int(len(text_content) / 3)
+            return int(len(text) / 3)
+
+    def _estimate_tokens(self) -> int:
+        """Estimate current token usage using tiktoken or fallback."""
+        # Collect all text content
+        texts = [self._message_text(msg) for msg in self.active_context]
+        if self.system_prompt:
+             texts.append(str(self.system_prompt.get("content", "")))
+
+        if not self.use_tiktoken:
+            # Char estimate needs only the lengths: skip building the joined string
+            return sum(map(len, texts)) // 3
+        return self._count_tokens("".join(texts))
+
+    def estimate_messages(self, messages: List[Dict[str, Any]]) -> int:
+        """Estimate the token cost of a list of non-system messages."""
+        texts = [self._message_text(msg) for msg in messages]
+        if not self.use_tiktoken:
+            return sum(map(len, texts)) // 3
+        return self._count_tokens("".join(texts))
 
     def get_usage(self) -> tuple[int, int]:
         current = self._estimate_tokens()
@@ -81,6 +103,7 @@ class ShortTermMemory:
 
     def _check_overflow(self):
         """Monitor token usage and raise signal if > 92%."""
+        self._chars_added_since_check = 0
         current = self._estimate_tokens()
         threshold = self.token_limit * 0.92
         
@@ -103,25 +126,32 @@ class ShortTermMemory:
         Aggressive Truncation: Keep removing oldest messages until usage is below target_ratio * limit.
         Returns the list of removed messages.
         """
-        removed_total = []
         target_tokens = int(self.token_limit * target_ratio)
-        
-        # Safety break to avoid infinite loop
-        max_loops = 50 
-        loops = 0
-        
-        while self._estimate_tokens() > target_tokens and self.active_context and loops < max_loops:
-            # Remove 2 messages (User + Assistant pair usually)
-            removed = self.truncate_fifo(count=2)
-            if not removed:
-                # Try removing 1 if 2 failed (odd number of messages?)
-                removed = self.truncate_fifo(count=1)
-                
-            if removed:
-                removed_total.extend(removed)
-            else:
+        context = self.active_context
+        count_tokens = self._count_tokens
+        message_text = self._message_text
+
+        # One tokenizer pass: cost every message once, then walk from the head
+        # instead of re-tokenizing the whole history after each removal.
+        costs = [count_tokens(message_text(msg)) for msg in context]
+        total = sum(costs)
+        if self.system_prompt:
+            total += count_tokens(str(self.system_prompt.get("content", "")))
+
+        remaining = len(context)
+        drop = 0
+        while total > target_tokens:
+            # Remove 2 messages (User + Assistant pair usually), 1 on an odd tail.
+            # The latest message is always kept.
+            step = 2 if remaining > 2 else 1 if remaining > 1 else 0
+            if not step:
                 break # Cannot truncate further
-            loops += 1
+            total -= sum(costs[drop:drop + step])
+            drop += step
+            remaining -= step
+
+        removed_total = context[:drop]
+        self.active_context = context[drop:]
             
         logger.info(f"Aggressive Truncation: Removed {len(removed_total)} messages to fit token limit.")
         return removed_total
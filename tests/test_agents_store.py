@@ -0,0 +1,52 @@
+import os
+import re
+import tempfile
+import unittest
+
+import tools.agents as agents
+
+
+class AgentStoreInvalidationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._orig_path = agents.AGENTS_STORE_PATH
+        agents.AGENTS_STORE_PATH = os.path.join(self._tmp.name, "agents.json")
+        agents._reset_store_caches()
+
+        result = await agents.agent_create("Code Reviewer", "Review python code", "blue")
+        self.agent_id = re.search(r"ID: ([0-9a-f-]+)", result).group(1)
+        # Warm the index and caches the way normal use does
+        self.assertIn("Code Reviewer", await agents.agent_use("code reviewer"))
+        self.assertNotIn("Error", await agents.agent_preview(self.agent_id))
+
+    async def asyncTearDown(self):
+        agents.AGENTS_STORE_PATH = self._orig_path
+        agents._reset_store_caches()
+        self._tmp.cleanup()
+
+    async def test_deleted_store_does_not_resolve_old_agents(self):
+        os.remove(agents.AGENTS_STORE_PATH)
+
+        self.assertTrue((await agents.agent_use(self.agent_id)).startswith("Error"))
+        self.assertTrue((await agents.agent_use("Code Reviewer")).startswith("Error"))
+        self.assertTrue((await agents.agent_preview(self.agent_id)).startswith("Error"))
+        self.assertEqual(await agents.agent_list(), "暂无自定义Agent。")
+
+    async def test_corrupt_store_does_not_resolve_old_agents(self):
+        with open(agents.AGENTS_STORE_PATH, "wb") as f:
+            f.write(b"{not json")
+
+        self.assertTrue((await agents.agent_use(self.agent_id)).startswith("Error"))
+        self.assertTrue((await agents.agent_preview(self.agent_id)).startswith("Error"))
+
+    async def test_recreated_agent_is_saved_to_new_store(self):
+        os.remove(agents.AGENTS_STORE_PATH)
+
+        await agents.agent_create("Code Reviewer", "Review python code again", "red")
+        listing = await agents.agent_list()
+        self.assertIn("@Code Reviewer", listing)
+        self.assertNotIn(self.agent_id, listing)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import glob
+import os
+import tempfile
+import unittest
+
+from tools.search.api import glob_search
+
+
+class GlobSearchHiddenTest(unittest.IsolatedAsyncioTestCase):
+    FILES = [
+        ".github/a.yml",
+        ".github/.cache/c.yml",
+        ".github/wf/b.yml",
+        ".github/wf/.x.yml",
+        "src/.hid/h.py",
+        "src/pkg/m.py",
+        "src/.e.py",
+        "src/n.py",
+    ]
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        for rel in self.FILES:
+            full = os.path.join(self.root, rel)
+            os.makedirs(os.path.dirname(full), exist_ok=True)
+            with open(full, "w") as f:
+                f.write("x\n")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    async def _found(self, pattern):
+        out = await glob_search(pattern, self.root)
+        if out == "未找到文件。":
+            return []
+        return sorted(os.path.relpath(p, self.root).replace(os.sep, "/") for p in out.splitlines())
+
+    def _expected(self, pattern):
+        hits = glob.glob(os.path.join(self.root, pattern), recursive=True)
+        return sorted(os.path.relpath(p, self.root).replace(os.sep, "/") for p in hits if os.path.isfile(p))
+
+    async def test_dot_segment_only_exposes_its_own_level(self):
+        self.assertEqual(await self._found(".github/**/*.yml"), [".github/a.yml", ".github/wf/b.yml"])
+        self.assertEqual(await self._found("*/.cache/*.yml"), [])
+
+    async def test_matches_glob_module(self):
+        for pattern in [
+            ".github/**/*.yml",
+            ".github/.cache/*.yml",
+            ".github/*/.x.yml",
+            "**/.github/*.yml",
+            "**/.cache/*.yml",
+            "**/*.py",
+            "src/*",
+            "src/.*",
+            "src/**",
+        ]:
+            with self.subTest(pattern=pattern):
+                self.assertEqual(await self._found(pattern), self._expected(pattern))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from memory import MemoryManager, MASK_KEEP_RECENT
+from memory.medium_term import MASKED_OBSERVATION
+
+
+class _FailingStream:
+    """Stream handler whose compressor call always fails (LLM outage)."""
+    def chat(self, messages, tools=None):
+        async def gen():
+            raise RuntimeError("LLM unavailable")
+            yield  # pragma: no cover - makes this an async generator
+        return gen()
+
+
+class BackgroundCompressionFailureTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)  # SessionStore creates memory/sessions under cwd
+        self.memory = MemoryManager(_FailingStream())
+        self.memory.short_term.token_limit = 2000
+
+        async def no_save():
+            pass
+        self.memory.auto_save = no_save
+
+        self.memory.short_term.system_prompt = {"role": "system", "content": "sys"}
+        for i in range(30):
+            if i % 3 == 2:
+                msg = {"role": "tool", "tool_call_id": f"c{i}", "content": "data " * 100}
+            else:
+                msg = {"role": "user" if i % 3 == 0 else "assistant", "content": "word " * 100}
+            msg["seq"] = i
+            self.memory.short_term.active_context.append(msg)
+
+    async def asyncTearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    async def test_failed_compression_does_not_regrow_truncated_context(self):
+        await self.memory.get_context()  # overflow: schedules compression, truncates
+        self.assertIsNotNone(self.memory._compress_task)
+        truncated = list(self.memory.short_term.active_context)
+        truncated_tokens = self.memory.short_term.estimate_messages(truncated)
+
+        await asyncio.wait_for(asyncio.shield(self.memory._compress_task), timeout=5)
+        await self.memory.get_context()  # turn boundary: apply the (failed) result
+
+        active = self.memory.short_term.active_context
+        self.assertLessEqual(len(active), len(truncated))
+        self.assertLessEqual(self.memory.short_term.estimate_messages(active), truncated_tokens)
+        # Only messages that survived the truncation are left
+        self.assertLessEqual({m["seq"] for m in active}, {m["seq"] for m in truncated})
+
+    async def test_failed_compression_masks_observations_in_current_context(self):
+        await self.memory.get_context()
+        await asyncio.wait_for(asyncio.shield(self.memory._compress_task), timeout=5)
+        await self.memory.get_context()
+
+        active = self.memory.short_term.active_context
+        older = active[:-MASK_KEEP_RECENT]
+        self.assertTrue(any(m["role"] == "tool" for m in older))
+        for m in older:
+            if m["role"] == "tool":
+                self.assertEqual(m["content"], MASKED_OBSERVATION)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,45 @@
 from tools.base import registry
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import os
 import json
 import re
 import uuid
-import aiofiles
+from types import MappingProxyType
+from utils.fileio import read_bytes, replace_bytes
 from utils.logger import console
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Persistent storage path
 AGENTS_STORE_PATH = os.path.join("memory", "agents.json")
 DEFAULT_USER_ID = "local_user"
 MAX_AGENTS_PER_USER = 20
+MAX_AGENT_NAME_LEN = 64
+MAX_AGENT_DESC_LEN = 4000
+
+_HEX_RE = re.compile(r"#?[0-9a-fA-F]{6}")
+_SPLIT_RE = re.compile(r"[,\n;]+")
+# 名称允许空格 (如 "Code Reviewer")，只拒绝控制字符
+_NAME_CONTROL_RE = re.compile(r"[\x00-\x1f\x7f]")
+PERSONA_START = "=== ACTIVE CUSTOM AGENT:START ==="
+PERSONA_END = "=== ACTIVE CUSTOM AGENT:END ==="
+
+# Parsed store, valid while the file's (st_mtime_ns, st_size) matches "key".
+# Callers mutate the returned dict in place and then save, so there is no copy.
+# "raw" holds the file's bytes so saves that would not change them can be skipped.
+_STORE_CACHE: Dict[str, Any] = {"key": None, "data": None, "raw": None}
+
+# Rendered preview / persona text per agent id. Definitions only change through
+# agent_update (which drops the entry) or an external edit (store re-read clears all).
+_PREVIEW_CACHE: Dict[str, str] = {}
+_PERSONA_CACHE: Dict[str, str] = {}
+
+# Per-user lookup index {user_id: (by_id, by_name_lower)}, built lazily from the
+# agent list. Dropped whenever the store is re-read or saved.
+_AGENT_INDEX: Dict[str, Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]] = {}
 
 
 def _ensure_store_dir():
@@ -19,35 +48,115 @@ def _ensure_store_dir():
         os.makedirs(parent, exist_ok=True)
 
 
+def _loads(content: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content.decode("utf-8"))
+
+
+def _dumps(data: Any) -> bytes:
+    """Serialize the store as indented UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _store_key() -> Optional[tuple]:
+    try:
+        st = os.stat(AGENTS_STORE_PATH)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _reset_store_caches():
+    """Forget everything derived from a previously loaded store."""
+    _PREVIEW_CACHE.clear()
+    _PERSONA_CACHE.clear()
+    _AGENT_INDEX.clear()
+    _STORE_CACHE["key"] = None
+    _STORE_CACHE["data"] = None
+    _STORE_CACHE["raw"] = None
+
+
 async def _load_store() -> Dict[str, Any]:
     _ensure_store_dir()
-    if not os.path.exists(AGENTS_STORE_PATH):
+    key = _store_key()
+    if key is None:
+        # Store file deleted: lookups must not keep resolving from the old index
+        _reset_store_caches()
         return {"users": {}}
+    if key == _STORE_CACHE["key"]:
+        return _STORE_CACHE["data"]
     try:
-        async with aiofiles.open(AGENTS_STORE_PATH, mode="r", encoding="utf-8") as f:
-            content = await f.read()
-        data = json.loads(content) if content.strip() else {"users": {}}
+        content = await read_bytes(AGENTS_STORE_PATH)
+        data = _loads(content) if content.strip() else {"users": {}}
         if "users" not in data:
             data["users"] = {}
+        _reset_store_caches()
+        _STORE_CACHE["key"] = key
+        _STORE_CACHE["data"] = data
+        _STORE_CACHE["raw"] = content
         return data
     except Exception:
+        # Unreadable / corrupt store: same as missing, drop the stale caches too
+        _reset_store_caches()
         return {"users": {}}
 
 
 async def _save_store(data: Dict[str, Any]) -> str:
+    _AGENT_INDEX.clear()
     try:
-        async with aiofiles.open(AGENTS_STORE_PATH, mode="w", encoding="utf-8") as f:
-            await f.write(json.dumps(data, ensure_ascii=False, indent=2))
+        payload = _dumps(data)
+        if payload == _STORE_CACHE["raw"] and _store_key() == _STORE_CACHE["key"]:
+            _STORE_CACHE["data"] = data
+            return f"Unchanged: {AGENTS_STORE_PATH}"
+        # temp file + os.replace: a crash mid-write never leaves a truncated store
+        await replace_bytes(AGENTS_STORE_PATH, payload)
+        # Next load is a cache hit without re-reading what we just wrote
+        _STORE_CACHE["key"] = _store_key()
+        _STORE_CACHE["data"] = data
+        _STORE_CACHE["raw"] = payload
         return f"Saved: {AGENTS_STORE_PATH}"
     except Exception as e:
+        _STORE_CACHE["key"] = None
         return f"Error saving store: {str(e)}"
 
 
+def _user_agents(store: Dict[str, Any], user_id: str) -> List[Dict[str, Any]]:
+    return store.get("users", {}).get(user_id, {}).get("agents", [])
+
+
+def _user_index(store: Dict[str, Any], user_id: str) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    index = _AGENT_INDEX.get(user_id)
+    if index is None:
+        agents = _user_agents(store, user_id)
+        index = _AGENT_INDEX[user_id] = (
+            {a["id"]: a for a in agents},
+            {a["name"].lower(): a for a in agents},
+        )
+    return index
+
+
+def _validate_name(name: str) -> Optional[str]:
+    """Return an error message for an unusable agent name, or None."""
+    if not name or not name.strip():
+        return "Error: Agent名称不能为空。"
+    if len(name) > MAX_AGENT_NAME_LEN:
+        return f"Error: Agent名称过长，最多 {MAX_AGENT_NAME_LEN} 个字符。"
+    if _NAME_CONTROL_RE.search(name):
+        return "Error: Agent名称不能包含控制字符 (如换行、制表符)。"
+    # 名称会写入系统提示词，不能包含人设区块的分隔标记
+    if PERSONA_START in name or PERSONA_END in name:
+        return "Error: Agent名称不能包含保留的标记文本。"
+    return None
+
+
 def _sanitize_hex_color(color: str) -> str:
     if not color:
         return "#4CAF50"  # default green
     color = color.strip()
-    if re.fullmatch(r"#?[0-9a-fA-F]{6}", color):
+    if _HEX_RE.fullmatch(color):
         return "#" + color.lstrip("#")
     # Allow preset names; fallback if invalid
     presets = {
@@ -57,65 +166,75 @@ def _sanitize_hex_color(color: str) -> str:
     return presets.get(color.lower(), "#4CAF50")
 
 
-def _expand_agent_config(name: str, base_desc: str) -> Dict[str, Any]:
-    """Deterministic expansion engine to generate a complete agent definition."""
-    keywords = [w.strip().lower() for w in re.split(r"[,\n;]+", base_desc) if w.strip()]
-
-    abilities = [
-        "代码搜索与分析",
-        "项目结构理解与模块依赖梳理",
-        "任务规划与分阶段执行",
-        "文件读写与补丁应用",
-        "交互式问答与决策确认",
-    ]
-    # Heuristic boosts based on keywords
-    if any(k in keywords for k in ["前端", "react", "web", "ui"]):
-        abilities.append("前端组件开发与样式优化")
-    if any(k in keywords for k in ["后端", "api", "flask", "fastapi"]):
-        abilities.append("后端API设计与实现")
-    if any(k in keywords for k in ["测试", "unit", "pytest"]):
-        abilities.append("单元测试编写与覆盖率提升")
-
-    behavior_rules = [
-        "严格遵循任务驱动闭环，先规划后执行",
-        "在执行阶段避免微观打断，必要时使用交互式确认",
-        "遵循Windows命令约束与编码规范，避免Bash专属语法",
-        "所有生成文件默认写入workspace目录，避免污染根目录",
-        "敏感信息不写入日志或代码，不提交秘钥",
-    ]
+# Static parts of every expanded definition; _expand_agent_config hands out copies
+# so records never share mutable state with these.
+_BASE_ABILITIES = (
+    "代码搜索与分析",
+    "项目结构理解与模块依赖梳理",
+    "任务规划与分阶段执行",
+    "文件读写与补丁应用",
+    "交互式问答与决策确认",
+)
 
-    dialogue_style = {
-        "tone": "简洁、专业、协作",
-        "format": "结构化要点+必要代码片段",
-        "language": "中文为主，代码注释遵循项目规范",
-    }
+# (trigger keywords, extra ability) heuristic boosts
+_ABILITY_BOOSTS = (
+    (frozenset({"前端", "react", "web", "ui"}), "前端组件开发与样式优化"),
+    (frozenset({"后端", "api", "flask", "fastapi"}), "后端API设计与实现"),
+    (frozenset({"测试", "unit", "pytest"}), "单元测试编写与覆盖率提升"),
+)
 
-    constraints = [
-        "单次回答不超过必要长度，避免长篇堆砌",
-        "不对不存在的库或命令做假设，先检索再使用",
-        "不在未确认的情况下修改核心系统文件",
-    ]
+_BEHAVIOR_RULES = (
+    "严格遵循任务驱动闭环，先规划后执行",
+    "在执行阶段避免微观打断，必要时使用交互式确认",
+    "遵循Windows命令约束与编码规范，避免Bash专属语法",
+    "所有生成文件默认写入workspace目录，避免污染根目录",
+    "敏感信息不写入日志或代码，不提交秘钥",
+)
 
-    scenarios = [
-        {"title": "快速项目理解", "example": "分析 core 与 tools 目录，输出模块关系图与职责说明"},
-        {"title": "特性开发闭环", "example": "根据需求生成Todo并自主执行，完成实现与验证"},
-        {"title": "Bug 修复与验证", "example": "定位异常栈，修复代码并提供最小复现与验证结果"},
-    ]
+_DIALOGUE_STYLE = MappingProxyType({
+    "tone": "简洁、专业、协作",
+    "format": "结构化要点+必要代码片段",
+    "language": "中文为主，代码注释遵循项目规范",
+})
 
-    notes = [
-        "当任务完成后，提供结果概要与下一步建议",
-        "遇到不确定信息时，优先检索代码库并给出证据",
-    ]
+_CONSTRAINTS = (
+    "单次回答不超过必要长度，避免长篇堆砌",
+    "不对不存在的库或命令做假设，先检索再使用",
+    "不在未确认的情况下修改核心系统文件",
+)
+
+_SCENARIOS = (
+    MappingProxyType({"title": "快速项目理解", "example": "分析 core 与 tools 目录，输出模块关系图与职责说明"}),
+    MappingProxyType({"title": "特性开发闭环", "example": "根据需求生成Todo并自主执行，完成实现与验证"}),
+    MappingProxyType({"title": "Bug 修复与验证", "example": "定位异常栈，修复代码并提供最小复现与验证结果"}),
+)
+
+_NOTES = (
+    "当任务完成后，提供结果概要与下一步建议",
+    "遇到不确定信息时，优先检索代码库并给出证据",
+)
+
+
+def _expand_agent_config(name: str, base_desc: str) -> Dict[str, Any]:
+    """Deterministic expansion engine to generate a complete agent definition."""
+    # Lower-case the whole description once; a set makes each boost check O(1) per trigger
+    keywords = frozenset(w.strip() for w in _SPLIT_RE.split(base_desc.lower()))
+
+    abilities = list(_BASE_ABILITIES)
+    # Heuristic boosts based on keywords
+    for triggers, ability in _ABILITY_BOOSTS:
+        if not triggers.isdisjoint(keywords):
+            abilities.append(ability)
 
     return {
         "name": name,
         "role": f"{name} — 定制人格化编程助手",
         "capabilities": abilities,
-        "behavior_rules": behavior_rules,
-        "dialogue_style": dialogue_style,
-        "constraints": constraints,
-        "scenarios": scenarios,
-        "notes": notes,
+        "behavior_rules": list(_BEHAVIOR_RULES),
+        "dialogue_style": dict(_DIALOGUE_STYLE),
+        "constraints": list(_CONSTRAINTS),
+        "scenarios": [dict(sc) for sc in _SCENARIOS],
+        "notes": list(_NOTES),
         "raw_requirements": base_desc.strip(),
     }
 
@@ -148,6 +267,52 @@ def _render_preview(agent: Dict[str, Any]) -> str:
     return "\n".join(lines)
 
 
+def _render_persona(persona: Dict[str, Any]) -> str:
+    """System-prompt block describing the active agent."""
+    persona_block = [
+        PERSONA_START,
+        f"Name: {persona.get('name')}",
+        f"Role: {persona.get('role')}",
+        "Capabilities: " + ", ".join(persona.get("capabilities", [])),
+        "Behavior Rules: " + "; ".join(persona.get("behavior_rules", [])),
+        "Constraints: " + "; ".join(persona.get("constraints", [])),
+        "Dialogue Style: " + json.dumps(persona.get("dialogue_style", {}), ensure_ascii=False),
+        PERSONA_END,
+    ]
+    return "\n".join(persona_block)
+
+
+def _strip_persona(system_prompt: str) -> str:
+    """Remove active agent blocks from a system prompt (fixed markers, no regex)."""
+    start = system_prompt.find(PERSONA_START)
+    while start >= 0:
+        end = system_prompt.find(PERSONA_END, start)
+        if end < 0:
+            break
+        system_prompt = system_prompt[:start] + system_prompt[end + len(PERSONA_END):]
+        start = system_prompt.find(PERSONA_START, start)
+    return system_prompt
+
+
+def _cached_preview(record: Dict[str, Any]) -> str:
+    text = _PREVIEW_CACHE.get(record["id"])
+    if text is None:
+        text = _PREVIEW_CACHE[record["id"]] = _render_preview(record["definition"])
+    return text
+
+
+def _cached_persona(record: Dict[str, Any]) -> str:
+    text = _PERSONA_CACHE.get(record["id"])
+    if text is None:
+        text = _PERSONA_CACHE[record["id"]] = _render_persona(record["definition"])
+    return text
+
+
+def _forget_rendered(agent_id: str):
+    _PREVIEW_CACHE.pop(agent_id, None)
+    _PERSONA_CACHE.pop(agent_id, None)
+
+
 @registry.register(
     name="agent_create",
     description="Create a custom agent with name, base description, and color. Enforces per-user limit.",
@@ -163,6 +328,14 @@ def _render_preview(agent: Dict[str, Any]) -> str:
 )
 async def agent_create(name: str, description: str, color: str, user_id: Optional[str] = None) -> str:
     user_id = user_id or DEFAULT_USER_ID
+    # Cheap input checks first: bad input never costs a store read
+    error = _validate_name(name)
+    if error:
+        return error
+    if not description or not description.strip():
+        return "Error: Agent描述不能为空。"
+    if len(description) > MAX_AGENT_DESC_LEN:
+        return f"Error: Agent描述过长，最多 {MAX_AGENT_DESC_LEN} 个字符。"
     color = _sanitize_hex_color(color)
     store = await _load_store()
     user_bucket = store["users"].get(user_id, {"agents": []})
@@ -170,7 +343,7 @@ async def agent_create(name: str, description: str, color: str, user_id: Optiona
     if len(agents) >= MAX_AGENTS_PER_USER:
         return f"Error: 已达到上限，每个用户最多创建 {MAX_AGENTS_PER_USER} 个自定义Agent。"
     # Unique name constraint within user
-    if any(a["name"].lower() == name.lower() for a in agents):
+    if name.lower() in _user_index(store, user_id)[1]:
         return "Error: 该名称的Agent已存在，请更换名称。"
     agent_id = str(uuid.uuid4())
     definition = _expand_agent_config(name, description)
@@ -185,7 +358,7 @@ async def agent_create(name: str, description: str, color: str, user_id: Optiona
     agents.append(record)
     store["users"][user_id] = {"agents": agents}
     await _save_store(store)
-    preview = _render_preview(definition)
+    preview = _cached_preview(record)
     return f"Agent 创建成功 (ID: {agent_id})\n颜色: {color}\n\n{preview}"
 
 
@@ -202,7 +375,7 @@ async def agent_create(name: str, description: str, color: str, user_id: Optiona
 async def agent_list(user_id: Optional[str] = None) -> str:
     user_id = user_id or DEFAULT_USER_ID
     store = await _load_store()
-    agents = store.get("users", {}).get(user_id, {}).get("agents", [])
+    agents = _user_agents(store, user_id)
     if not agents:
         return "暂无自定义Agent。"
     lines = []
@@ -223,11 +396,10 @@ async def agent_list(user_id: Optional[str] = None) -> str:
 async def agent_preview(id: str, user_id: Optional[str] = None) -> str:
     user_id = user_id or DEFAULT_USER_ID
     store = await _load_store()
-    agents = store.get("users", {}).get(user_id, {}).get("agents", [])
-    target = next((x for x in agents if x["id"] == id), None)
+    target = _user_index(store, user_id)[0].get(id)
     if not target:
         return "Error: 未找到指定Agent。"
-    return _render_preview(target["definition"])
+    return _cached_preview(target)
 
 
 @registry.register(
@@ -249,26 +421,39 @@ async def agent_preview(id: str, user_id: Optional[str] = None) -> str:
 async def agent_update(id: str, name: Optional[str] = None, description: Optional[str] = None, color: Optional[str] = None, enabled: Optional[bool] = None, definition: Optional[Dict[str, Any]] = None, user_id: Optional[str] = None) -> str:
     user_id = user_id or DEFAULT_USER_ID
     store = await _load_store()
-    agents = store.get("users", {}).get(user_id, {}).get("agents", [])
-    idx = next((i for i, x in enumerate(agents) if x["id"] == id), None)
-    if idx is None:
+    by_id, by_name = _user_index(store, user_id)
+    rec = by_id.get(id)
+    if rec is None:
         return "Error: 未找到指定Agent。"
-    rec = agents[idx]
     if name:
+        error = _validate_name(name)
+        if error:
+            return error
         # prevent duplicate names
-        if any(x["name"].lower() == name.lower() and x["id"] != id for x in agents):
+        other = by_name.get(name.lower())
+        if other is not None and other["id"] != id:
             return "Error: 该名称已被其他Agent使用。"
-        rec["name"] = name
-    if description:
-        rec["definition"] = _expand_agent_config(rec["name"], description)
+    # Collect effective changes first so a no-op update never touches the store
+    changes: Dict[str, Any] = {}
+    if name and name != rec["name"]:
+        changes["name"] = name
+    # An explicit definition takes precedence over one expanded from description
+    new_definition = definition or (
+        _expand_agent_config(changes.get("name", rec["name"]), description) if description else None
+    )
+    if new_definition and new_definition != rec["definition"]:
+        changes["definition"] = new_definition
     if color:
-        rec["color"] = _sanitize_hex_color(color)
-    if enabled is not None:
-        rec["enabled"] = bool(enabled)
-    if definition:
-        rec["definition"] = definition
-    agents[idx] = rec
-    store["users"][user_id] = {"agents": agents}
+        new_color = _sanitize_hex_color(color)
+        if new_color != rec.get("color"):
+            changes["color"] = new_color
+    if enabled is not None and bool(enabled) != rec.get("enabled"):
+        changes["enabled"] = bool(enabled)
+    if not changes:
+        return "Agent 无变化，无需更新。"
+    rec.update(changes)
+    if "definition" in changes:
+        _forget_rendered(id)
     await _save_store(store)
     return "Agent 更新成功。"
 
@@ -284,12 +469,12 @@ async def agent_update(id: str, name: Optional[str] = None, description: Optiona
 async def agent_delete(id: str, user_id: Optional[str] = None) -> str:
     user_id = user_id or DEFAULT_USER_ID
     store = await _load_store()
-    agents = store.get("users", {}).get(user_id, {}).get("agents", [])
-    new_agents = [x for x in agents if x["id"] != id]
-    if len(new_agents) == len(agents):
+    if id not in _user_index(store, user_id)[0]:
         return "Error: 未找到指定Agent。"
+    new_agents = [x for x in _user_agents(store, user_id) if x["id"] != id]
     store["users"][user_id] = {"agents": new_agents}
     await _save_store(store)
+    _forget_rendered(id)
     return "Agent 已删除。"
 
 
@@ -304,8 +489,7 @@ async def agent_delete(id: str, user_id: Optional[str] = None) -> str:
 async def agent_share(id: str, user_id: Optional[str] = None) -> str:
     user_id = user_id or DEFAULT_USER_ID
     store = await _load_store()
-    agents = store.get("users", {}).get(user_id, {}).get("agents", [])
-    target = next((x for x in agents if x["id"] == id), None)
+    target = _user_index(store, user_id)[0].get(id)
     if not target:
         return "Error: 未找到指定Agent。"
     # Simple pseudo link schema for sharing
@@ -324,36 +508,20 @@ async def agent_share(id: str, user_id: Optional[str] = None) -> str:
 async def agent_use(identifier: str, user_id: Optional[str] = None, context: Any = None) -> str:
     user_id = user_id or DEFAULT_USER_ID
     store = await _load_store()
-    agents = store.get("users", {}).get(user_id, {}).get("agents", [])
-    target = next((x for x in agents if x["id"] == identifier or x["name"].lower() == identifier.lower()), None)
+    by_id, by_name = _user_index(store, user_id)
+    target = by_id.get(identifier) or by_name.get(identifier.lower())
     if not target:
         return "Error: 未找到指定Agent。"
     if not target.get("enabled", True):
         return "Error: 该Agent已被禁用，无法使用。"
     # Compose persona block
-    persona = target["definition"]
-    persona_block = [
-        "=== ACTIVE CUSTOM AGENT:START ===",
-        f"Name: {persona.get('name')}",
-        f"Role: {persona.get('role')}",
-        "Capabilities: " + ", ".join(persona.get("capabilities", [])),
-        "Behavior Rules: " + "; ".join(persona.get("behavior_rules", [])),
-        "Constraints: " + "; ".join(persona.get("constraints", [])),
-        "Dialogue Style: " + json.dumps(persona.get("dialogue_style", {}), ensure_ascii=False),
-        "=== ACTIVE CUSTOM AGENT:END ===",
-    ]
-    persona_text = "\n".join(persona_block)
+    persona_text = _cached_persona(target)
     # Update system prompt via context.memory_manager
     if context and hasattr(context, "memory_manager"):
         # Append to existing system prompt
         current_sp = context.memory_manager.get_system_prompt()
         # Remove previous active agent block if exists
-        new_sp = re.sub(
-            r"=== ACTIVE CUSTOM AGENT:START ===.*?=== ACTIVE CUSTOM AGENT:END ===",
-            "",
-            current_sp,
-            flags=re.S
-        ).strip()
+        new_sp = _strip_persona(current_sp).strip()
         new_sp = f"{new_sp}\n\n{persona_text}".strip()
         context.memory_manager.set_system_prompt(new_sp)
         # Also attach current agent metadata onto context for UI display (optional)
@@ -1,6 +1,7 @@
-from typing import Dict, Any, Callable, List
+from typing import Dict, Any, Callable, List, Optional
 from dataclasses import dataclass
 import inspect
+from utils.logger import logger
 
 @dataclass
 class ToolDefinition:
@@ -8,19 +9,41 @@ class ToolDefinition:
     description: str
     parameters: Dict[str, Any]
     func: Callable
+    accepts_context: bool = False # Resolved once at register time
+    is_coro: bool = False
     
 class ToolRegistry:
     def __init__(self):
         self.tools: Dict[str, ToolDefinition] = {}
+        self._schema_cache: Optional[List[Dict[str, Any]]] = None
 
     def register(self, name: str, description: str, parameters: Dict[str, Any]):
         def decorator(func):
-            self.tools[name] = ToolDefinition(name, description, parameters, func)
+            existing = self.tools.get(name)
+            if existing is not None:
+                # 同一函数重复注册 (模块被重复导入) 时直接跳过，避免重复构建定义和失效 schema
+                if existing.func is func or (
+                    existing.func.__module__ == func.__module__
+                    and existing.func.__qualname__ == func.__qualname__
+                ):
+                    return existing.func
+                logger.warning(f"Tool '{name}' is already registered by {existing.func.__module__}; overriding with {func.__module__}.")
+            self.tools[name] = ToolDefinition(
+                name, description, parameters, func,
+                accepts_context="context" in inspect.signature(func).parameters,
+                is_coro=inspect.iscoroutinefunction(func)
+            )
+            self._schema_cache = None
             return func
         return decorator
 
+    def __contains__(self, name: str) -> bool:
+        return name in self.tools
+
     def get_schema(self) -> List[Dict[str, Any]]:
-        """Generate OpenAI/ZhipuAI compatible tool schema."""
+        """Generate OpenAI/ZhipuAI compatible tool schema (built once, reset by register)."""
+        if self._schema_cache is not None:
+            return self._schema_cache
         schemas = []
         for tool in self.tools.values():
             schemas.append({
@@ -35,26 +58,26 @@ class ToolRegistry:
                     }
                 }
             })
+        self._schema_cache = schemas
         return schemas
 
     async def execute(self, name: str, args: Dict[str, Any], context: Any = None) -> str:
         if name not in self.tools:
             return f"Error: Tool '{name}' not found."
         try:
-            func = self.tools[name].func
+            tool = self.tools[name]
+            func = tool.func
             
             # Check if function accepts 'context' argument
-            sig = inspect.signature(func)
-            if "context" in sig.parameters:
+            if tool.accepts_context:
                 if context is None:
                      return f"Error: Tool '{name}' requires context but none was provided."
                 # Inject context into args (don't modify original args dict)
-                call_args = args.copy()
-                call_args["context"] = context
+                call_args = {**args, "context": context}
             else:
                 call_args = args
 
-            if inspect.iscoroutinefunction(func):
+            if tool.is_coro:
                 return await func(**call_args)
             return func(**call_args)
         except Exception as e:
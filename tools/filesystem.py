@@ -1,95 +1,138 @@
 import os
+import asyncio
 import difflib
-import aiofiles
+import itertools
 from tools.base import registry
+from utils.fileio import read_text, write_text
 from tools.interaction import ask_selection
 from utils.logger import console
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
+from rich.style import Style
 from rich import box
 
+# Above this many lines the side-by-side table falls back to streamed unified hunks
+DIFF_SIDE_BY_SIDE_MAX_LINES = 5000
+
+# Parsed once instead of per row
+_STYLE_REMOVED = Style(color="red")
+_STYLE_ADDED = Style(color="green")
+
+def _render_unified_diff(path: str, old_lines: list, new_lines: list, max_rows: int = 200, context: int = 2):
+    """Compact diff for large files: unified hunks, rendered up to max_rows lines."""
+    body = Text()
+    changed_blocks = 0
+    added = 0
+    removed = 0
+    rows = 0
+    hunks = difflib.unified_diff(old_lines, new_lines, n=context, lineterm="")
+    # Skip the two ---/+++ file header lines
+    for line in itertools.islice(hunks, 2, None):
+        if line.startswith("@@"):
+            changed_blocks += 1
+            style = "cyan"
+        elif line.startswith("+"):
+            added += 1
+            style = "green"
+        elif line.startswith("-"):
+            removed += 1
+            style = "red"
+        else:
+            style = ""
+        if rows < max_rows:
+            body.append(line + "\n", style=style)
+            rows += 1
+
+    console.print(Panel(body, title=f"代码变更预览: {path}", border_style="cyan"))
+    console.print(f"变更块: {changed_blocks} | 新增行: {added} | 删除行: {removed}")
+
 def _render_diff(path: str, old_content: str, new_content: str):
+    if old_content == new_content:
+        console.print(f"[dim]Diff Preview: {path} (内容无变化)[/dim]")
+        return
     old_lines = old_content.splitlines()
     new_lines = new_content.splitlines()
-    matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
-    table = Table(title=f"Diff Preview: {path}", box=box.SIMPLE, show_lines=False)
-    table.add_column("原始代码", overflow="fold")
-    table.add_column("修改后代码", overflow="fold")
+    if old_lines == new_lines:
+        # Only line endings / trailing newline differ: nothing to tabulate
+        console.print(f"[dim]Diff Preview: {path} (仅换行符变化)[/dim]")
+        return
+    if max(len(old_lines), len(new_lines)) > DIFF_SIDE_BY_SIDE_MAX_LINES:
+        _render_unified_diff(path, old_lines, new_lines)
+        return
+    # Source lines gain nothing from the popular-line junk heuristic
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
     old_no = 1
     new_no = 1
     changed_blocks = 0
     added = 0
     removed = 0
-    rows = 0
     max_rows = 200
     context = 2
-
-    def add_row(left_text: Text, right_text: Text):
-        nonlocal rows
-        if rows >= max_rows:
-            return False
-        table.add_row(left_text, right_text)
-        rows += 1
-        return True
+    # Plain (left, right, left_style, right_style) tuples; Text objects are only
+    # built for the rows that are actually shown, and once the table is full the
+    # remaining opcodes just update the stats.
+    rows = []
 
     for tag, i1, i2, j1, j2 in matcher.get_opcodes():
         if tag == "equal":
+            if len(rows) >= max_rows:
+                continue
             segment_len = i2 - i1
             if segment_len > context * 2 + 1:
-                for idx in range(i1, i1 + context):
-                    left = Text(f"{old_no:4}| {old_lines[idx]}")
-                    right = Text(f"{new_no:4}| {new_lines[j1 + (idx - i1)]}")
-                    if not add_row(left, right):
-                        break
-                    old_no += 1
-                    new_no += 1
-                if rows < max_rows:
-                    add_row(Text("   | ..."), Text("   | ..."))
-                old_no += segment_len - context * 2
-                new_no += segment_len - context * 2
-                for idx in range(i2 - context, i2):
-                    if rows >= max_rows:
-                        break
-                    left = Text(f"{old_no:4}| {old_lines[idx]}")
-                    right = Text(f"{new_no:4}| {new_lines[j2 - context + (idx - (i2 - context))]}")
-                    add_row(left, right)
-                    old_no += 1
-                    new_no += 1
+                for k in range(context):
+                    rows.append((f"{old_no + k:4}| {old_lines[i1 + k]}", f"{new_no + k:4}| {new_lines[j1 + k]}", None, None))
+                rows.append(("   | ...", "   | ...", None, None))
+                skip = segment_len - context
+                for k in range(skip, segment_len):
+                    rows.append((f"{old_no + k:4}| {old_lines[i1 + k]}", f"{new_no + k:4}| {new_lines[j1 + k]}", None, None))
             else:
-                for idx in range(i1, i2):
-                    left = Text(f"{old_no:4}| {old_lines[idx]}")
-                    right = Text(f"{new_no:4}| {new_lines[j1 + (idx - i1)]}")
-                    if not add_row(left, right):
-                        break
-                    old_no += 1
-                    new_no += 1
+                for k in range(segment_len):
+                    rows.append((f"{old_no + k:4}| {old_lines[i1 + k]}", f"{new_no + k:4}| {new_lines[j1 + k]}", None, None))
+            old_no += segment_len
+            new_no += segment_len
         else:
             changed_blocks += 1
-            old_seg = old_lines[i1:i2]
-            new_seg = new_lines[j1:j2]
-            if tag in ["replace", "delete"]:
-                removed += len(old_seg)
-            if tag in ["replace", "insert"]:
-                added += len(new_seg)
-            max_len = max(len(old_seg), len(new_seg))
-            for k in range(max_len):
-                left_line = old_seg[k] if k < len(old_seg) else ""
-                right_line = new_seg[k] if k < len(new_seg) else ""
-                left_no = f"{old_no:4}" if k < len(old_seg) else "    "
-                right_no = f"{new_no:4}" if k < len(new_seg) else "    "
-                left = Text(f"{left_no}| {left_line}", style="red" if k < len(old_seg) else "")
-                right = Text(f"{right_no}| {right_line}", style="green" if k < len(new_seg) else "")
-                if not add_row(left, right):
-                    break
-                if k < len(old_seg):
-                    old_no += 1
-                if k < len(new_seg):
-                    new_no += 1
+            old_len = i2 - i1
+            new_len = j2 - j1
+            removed += old_len
+            added += new_len
+            for k in range(min(max(old_len, new_len), max_rows - len(rows))):
+                if k < old_len:
+                    left = (f"{old_no + k:4}| {old_lines[i1 + k]}", _STYLE_REMOVED)
+                else:
+                    left = ("    | ", None)
+                if k < new_len:
+                    right = (f"{new_no + k:4}| {new_lines[j1 + k]}", _STYLE_ADDED)
+                else:
+                    right = ("    | ", None)
+                rows.append((left[0], right[0], left[1], right[1]))
+            old_no += old_len
+            new_no += new_len
+
+    table = Table(title=f"Diff Preview: {path}", box=box.SIMPLE, show_lines=False)
+    table.add_column("原始代码", overflow="fold")
+    table.add_column("修改后代码", overflow="fold")
+    for left, right, left_style, right_style in itertools.islice(rows, max_rows):
+        table.add_row(Text(left, style=left_style or ""), Text(right, style=right_style or ""))
 
     console.print(Panel(table, title="代码变更预览", border_style="cyan"))
     console.print(f"变更块: {changed_blocks} | 新增行: {added} | 删除行: {removed}")
 
+def _read_line_window(path: str, offset: int, limit: int):
+    """
+    Read only lines [offset, offset + limit) plus one line of look-ahead.
+    Returns (selected, has_more, total_lines); total_lines is set only when the
+    offset is past the end, where the whole file has been counted anyway.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        skipped = sum(1 for _ in itertools.islice(f, offset))
+        selected = list(itertools.islice(f, limit))
+        if not selected:
+            return [], False, skipped
+        has_more = next(f, None) is not None
+    return selected, has_more, None
+
 @registry.register(
     name="read",
     description="Read file content with line numbers. Use offset/limit for large files.",
@@ -109,24 +152,28 @@ async def read_file(path: str, offset: int = 0, limit: int = 200) -> str:
         return f"Error: File {path} not found."
     
     try:
-        async with aiofiles.open(path, mode='r', encoding='utf-8') as f:
-            lines = await f.readlines()
-            
-        total_lines = len(lines)
-        if offset >= total_lines:
+        selected, has_more, total_lines = await asyncio.to_thread(_read_line_window, path, offset, limit)
+        if total_lines is not None:
             return f"Error: Offset {offset} is out of bounds (file has {total_lines} lines)."
             
-        selected = lines[offset : offset + limit]
         content = "".join(f"{offset + i + 1:4}| {line}" for i, line in enumerate(selected))
         
         footer = ""
-        if offset + limit < total_lines:
-            footer = f"\n... ({total_lines - (offset + limit)} more lines) ..."
+        if has_more:
+            footer = f"\n... (more lines, continue with offset={offset + limit}) ..."
             
         return content + footer
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
+def _create_and_write(path: str, content: str):
+    """Create parent directories and write the file in one blocking call."""
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
 @registry.register(
     name="write",
     description="Write content to a file (overwrites existing).",
@@ -143,18 +190,15 @@ async def write_file(path: str, content: str, context=None) -> str:
         if not os.path.isabs(path):
             path = os.path.join(os.getcwd(), path)
         old_content = ""
-        if os.path.exists(path):
-            async with aiofiles.open(path, mode='r', encoding='utf-8') as f:
-                old_content = await f.read()
+        # Nothing to diff against for a missing or empty file: skip the read
+        if os.path.isfile(path) and os.path.getsize(path) > 0:
+            old_content = await read_text(path)
         _render_diff(path, old_content, content)
         decision = await ask_selection("是否保留这些修改？", ["保留修改", "放弃修改"], context)
         if "放弃" in decision:
             return "已放弃修改。"
-        parent = os.path.dirname(path)
-        if parent and not os.path.exists(parent):
-            os.makedirs(parent, exist_ok=True)
-        async with aiofiles.open(path, mode='w', encoding='utf-8') as f:
-            await f.write(content)
+        # Only touch the filesystem once the change is accepted
+        await asyncio.to_thread(_create_and_write, path, content)
         return f"Successfully wrote to {path}"
     except Exception as e:
         return f"Error writing file: {str(e)}"
@@ -178,8 +222,7 @@ async def edit_file(path: str, old_str: str, new_str: str, context=None) -> str:
         return f"Error: File {path} not found."
         
     try:
-        async with aiofiles.open(path, mode='r', encoding='utf-8') as f:
-            content = await f.read()
+        content = await read_text(path)
             
         if old_str not in content:
             return "Error: old_str not found in file."
@@ -194,8 +237,7 @@ async def edit_file(path: str, old_str: str, new_str: str, context=None) -> str:
         decision = await ask_selection("是否保留这些修改？", ["保留修改", "放弃修改"], context)
         if "放弃" in decision:
             return "已放弃修改。"
-        async with aiofiles.open(path, mode='w', encoding='utf-8') as f:
-            await f.write(new_content)
+        await write_text(path, new_content)
             
         return "Successfully edited file."
     except Exception as e:
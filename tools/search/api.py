@@ -1,11 +1,29 @@
 import os
-import glob as pyglob
+import heapq
 from tools.base import registry
-from utils.logger import logger
-from tools.search.engine import RipgrepSearcher
-from tools.search.templates import get_template
+from utils.logger import logger, linfo
+from tools.search.engine import RipgrepSearcher, format_hits, glob_to_regex, walk_files
+from tools.search.templates import build_pattern
 from tools.search.parser import SyntaxAwareParser
 
+# glob 工具遍历时剪枝的目录
+GLOB_IGNORE_DIRS = frozenset({".git", "venv", ".venv", "__pycache__"})
+_GLOB_MAGIC = frozenset("*?[")
+
+def _split_glob_root(pattern: str):
+    """
+    拆出模式开头不含通配符的目录部分 (如 /abs/dir、../x)，作为遍历起点；
+    返回 (前缀目录, 剩余模式)。绝对路径和 .. 等无法用相对路径匹配的前缀由此处理。
+    """
+    parts = pattern.split("/")
+    i = 0
+    while i < len(parts) - 1 and _GLOB_MAGIC.isdisjoint(parts[i]):
+        i += 1
+    prefix = "/".join(parts[:i])
+    if i and not prefix:
+        prefix = "/"  # 形如 /*.py 的根目录模式
+    return prefix, "/".join(parts[i:])
+
 searcher = RipgrepSearcher()
 parser = SyntaxAwareParser()
 
@@ -40,61 +58,66 @@ async def smart_search(query: str, template: str = None, lang: str = "python", p
     
     # 1. 应用场景模板
     if template:
-        tpl = get_template(lang, template)
-        if tpl:
-            final_pattern = tpl.format(pattern=query)
-            logger.info(f"应用搜索模板: {template} ({lang}) -> {final_pattern}")
+        pattern = build_pattern(lang, template, query)
+        if pattern:
+            final_pattern = pattern
+            linfo(lambda: f"应用搜索模板: {template} ({lang}) -> {final_pattern}")
         else:
             logger.warning(f"未找到语言 '{lang}' 的模板 '{template}'，将使用原始查询。")
 
-    # 2. 执行搜索 (Ripgrep / Fallback)
-    raw_results = await searcher.search(final_pattern, path=path, include=include)
+    # 2. 执行搜索 (Ripgrep / Fallback)，返回结构化的 (file_path, line_num, content) 命中
+    hits, truncated, error = await searcher.search_hits(final_pattern, path=path, include=include)
+    if error:
+        return error
+    raw_results = format_hits(hits, truncated)
     
-    # 如果不需要扩展范围，或者搜索出错/无结果，直接返回
-    if not expand_scope or "未找到匹配项" in raw_results or raw_results.startswith("Error") or raw_results.startswith("rg 执行错误"):
+    # 如果不需要扩展范围，或者无结果，直接返回
+    if not expand_scope or not hits:
         return raw_results
 
     # 3. 范围扩展逻辑 (Tree-sitter Scope Expansion)
     # 这是一个实验性功能，旨在返回更完整的上下文。
-    lines = raw_results.split('\n')
     expanded_results = []
-    processed_files = set()
+    processed_files: set = set()  # (file_path, start, end)
+    # 每个文件只读取一次，同一文件的多个命中复用
+    file_lines = {}
 
-    for line in lines:
-        # 预期格式: file_path:line_num: content
-        parts = line.split(':', 2)
-        if len(parts) < 3: continue
-        
-        file_path = parts[0]
-        try:
-            line_num = int(parts[1])
-        except ValueError:
-            continue
-            
-        # 避免重复处理同一文件的同一范围
-        # 简化版: 仅检查是否处理过该文件+范围
-        
-        scope = parser.get_function_scope(file_path, line_num)
-        if scope:
-            start, end = scope
-            key = f"{file_path}:{start}-{end}"
-            if key in processed_files:
+    # 先按文件分组并去重行号 (保持文件首次出现的顺序)，重叠的命中在查询 scope 前就合并
+    hits_by_file: dict = {}
+    for file_path, line_num, content in hits:
+        hits_by_file.setdefault(file_path, {}).setdefault(line_num, content)
+
+    for file_path, line_hits in hits_by_file.items():
+        covered_end = 0
+        for line_num in sorted(line_hits):
+            # 已被本文件上一个输出的范围覆盖，跳过
+            if line_num <= covered_end:
                 continue
-            processed_files.add(key)
-            
-            expanded_results.append(f"\n--- Scope: {file_path} ({start}-{end}) ---")
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    all_lines = f.readlines()
+
+            scope = parser.get_function_scope(file_path, line_num)
+            if scope:
+                start, end = scope
+                key = (file_path, start, end)
+                if key in processed_files:
+                    continue
+                processed_files.add(key)
+                covered_end = max(covered_end, end)
+                
+                expanded_results.append(f"\n--- Scope: {file_path} ({start}-{end}) ---")
+                try:
+                    all_lines = file_lines.get(file_path)
+                    if all_lines is None:
+                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                            all_lines = file_lines[file_path] = f.readlines()
                     # Python 列表切片是 0-indexed，start/end 是 1-indexed
                     # 我们需要 start-1 到 end
                     snippet = "".join(all_lines[start-1:end])
                     expanded_results.append(snippet.strip())
-            except Exception:
-                expanded_results.append(f"(无法读取文件内容: {file_path})")
-        else:
-            # 如果无法获取范围 (如 Tree-sitter 未安装或解析失败)，保留原始行
-            expanded_results.append(line)
+                except Exception:
+                    expanded_results.append(f"(无法读取文件内容: {file_path})")
+            else:
+                # 如果无法获取范围 (如 Tree-sitter 未安装或解析失败)，保留原始行
+                expanded_results.append(f"{file_path}:{line_num}:{line_hits[line_num]}")
 
     if not expanded_results:
         return raw_results
@@ -117,18 +140,34 @@ async def glob_search(pattern: str, path: str = ".") -> str:
     按名称查找文件 (Glob)。
     """
     try:
-        full_pattern = os.path.join(path, pattern)
-        files = pyglob.glob(full_pattern, recursive=True)
-        # 过滤掉常见的无关目录
-        files = [f for f in files if ".git" not in f and "venv" not in f and "__pycache__" not in f]
-        
-        if not files:
+        pattern = pattern.replace("\\", "/")
+        # 字面目录前缀并入遍历起点 (与 glob.glob(os.path.join(path, pattern)) 一致)
+        prefix, pattern = _split_glob_root(pattern)
+        if prefix:
+            path = os.path.join(path, prefix)
+        # 与 glob 一致: 隐藏文件/目录只由显式以 . 开头的模式段匹配 (逐段判断)
+        matcher = glob_to_regex(pattern, match_hidden=False)
+        # 没有 . 开头的模式段时隐藏条目不可能命中，遍历时直接剪掉
+        include_hidden = any(part.startswith(".") for part in pattern.split("/"))
+        # 不含 ** 的模式深度固定，无需遍历更深的目录
+        max_depth = None if "**" in pattern else pattern.count("/")
+        prefix_len = len(os.path.join(path, ""))
+
+        matched = []
+        for entry in walk_files(path, GLOB_IGNORE_DIRS, include_hidden, max_depth):
+            rel = entry.path[prefix_len:].replace(os.sep, "/")
+            if matcher.match(rel):
+                try:
+                    # scandir 的 DirEntry 缓存 stat 结果，每个文件只需一次系统调用
+                    matched.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    continue
+
+        if not matched:
             return "未找到文件。"
-            
-        # 按修改时间排序 (最新的在前)
-        files.sort(key=lambda x: os.path.getmtime(x) if os.path.isfile(x) else 0, reverse=True)
-        
-        return "\n".join(files[:50]) # 限制返回前 50 个
+
+        # 按修改时间排序 (最新的在前)，限制返回前 50 个
+        return "\n".join(f for _, f in heapq.nlargest(50, matched))
     except Exception as e:
         return f"执行 glob 出错: {str(e)}"
 
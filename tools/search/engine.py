@@ -1,10 +1,360 @@
+import asyncio
+import base64
+import io
+import json
+import mmap
 import shutil
-import subprocess
 import os
-import glob as pyglob
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Callable, Iterator, List, Optional, Tuple
 from utils.logger import logger
 
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# 可执行文件路径在导入时解析一次 (PATH 在进程内基本不变)，之后直接以绝对路径启动，
+# 不再每次实例化 / 每次搜索都遍历 PATH
+_RG_PATH = shutil.which("rg")
+_GIT_PATH = shutil.which("git")
+
+# include → rg 内置文件类型 (预编译的类型 glob 比用户 glob 更快)。
+# 只收录类型恰好等于该单一扩展名的条目；py/js/ts/c/cpp/java 等类型会额外匹配
+# .pyi/.jsx/.vue/.h 等，结果会与 git grep / Python 原生实现不一致，仍走 -g
+_INCLUDE_TO_RGTYPE = {
+    "*.rs": "rust",
+    "*.go": "go",
+}
+
+MAX_OUTPUT_LINES = 200  # 限制输出大小，防止上下文溢出
+SEARCH_TIMEOUT = 30  # 秒，与 run_shell 一致
+MAX_LINE_CHARS = 512  # 单行匹配内容的最大长度 (rg --json 不支持 --max-columns)
+
+# 搜索命中: (文件路径, 行号, 行内容)
+Hit = Tuple[str, int, str]
+
+async def _run_streamed(cmd: List[str], cwd: Optional[str] = None, parse: Optional[Callable[[bytes], Any]] = None) -> Tuple[List[Any], bool, Optional[int], str]:
+    """
+    以异步子进程运行搜索命令并逐行读取 stdout，不阻塞事件循环。
+    parse 将每行原始输出转换为结果项 (返回 None 表示忽略该行)，默认解码为文本。
+    收集满 MAX_OUTPUT_LINES 项后立即终止子进程，不再等待其扫描剩余文件。
+    返回 (items, truncated, returncode, stderr)；超时时 returncode 为 None。
+    """
+    if parse is None:
+        parse = lambda raw: raw.decode('utf-8', errors='replace').rstrip('\r\n')
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=16 * 1024 * 1024  # --json 输出的超长行
+    )
+    # stderr 并发读取，避免其管道写满导致子进程阻塞
+    stderr_task = asyncio.ensure_future(proc.stderr.read())
+    lines: List[Any] = []
+    truncated = False
+
+    async def collect():
+        nonlocal truncated
+        while True:
+            raw = await proc.stdout.readline()
+            if not raw:
+                return
+            item = parse(raw)
+            if item is None:
+                continue
+            if len(lines) >= MAX_OUTPUT_LINES:
+                truncated = True
+                return
+            lines.append(item)
+
+    timed_out = False
+    drained = False
+    try:
+        try:
+            await asyncio.wait_for(collect(), timeout=SEARCH_TIMEOUT)
+            drained = not truncated
+        except asyncio.TimeoutError:
+            timed_out = True
+    finally:
+        # 截断、超时，或 parse 抛出异常 / 任务被取消时终止仍在运行的子进程；
+        # 无论哪种情况都等待 stderr 读取任务和子进程退出，避免泄漏
+        if not drained and proc.returncode is None:
+            proc.kill()
+        stderr = await stderr_task
+        await proc.wait()
+    returncode = None if timed_out else proc.returncode
+    return lines, truncated, returncode, stderr.decode('utf-8', errors='replace')
+
+def _json_text(obj: dict) -> str:
+    """rg --json 中非 UTF-8 内容以 base64 的 "bytes" 字段给出。"""
+    if "text" in obj:
+        return obj["text"]
+    return base64.b64decode(obj.get("bytes", "")).decode('utf-8', errors='replace')
+
+def _parse_rg_json(raw: bytes) -> Optional[Hit]:
+    """解析一条 rg --json 记录，仅保留 match / context 记录。"""
+    record = json.loads(raw)
+    if record.get("type") not in ("match", "context"):
+        return None
+    data = record["data"]
+    text = _json_text(data["lines"]).rstrip('\r\n')
+    return (_json_text(data["path"]), data["line_number"], text[:MAX_LINE_CHARS])
+
+def _parse_git_grep_z(raw: bytes) -> Optional[Hit]:
+    """解析 git grep -z -n 输出: path\\0line\\0content (路径中含冒号也不会歧义)。"""
+    parts = raw.rstrip(b'\r\n').split(b'\0', 2)
+    if len(parts) < 3:
+        return None
+    return (parts[0].decode('utf-8', errors='replace'), int(parts[1]), parts[2].decode('utf-8', errors='replace'))
+
+def format_hits(hits: List[Hit], truncated: bool = False) -> str:
+    """将命中格式化为 file_path:line_num:content 文本。"""
+    if not hits:
+        return "未找到匹配项。"
+    output = "\n".join(f"{path}:{line_no}:{text}" for path, line_no, text in hits)
+    if truncated:
+        output += f"\n... (已截断，仅显示前 {len(hits)} 个匹配项)"
+    return output
+
+MAX_FALLBACK_HITS = 100
+MAX_FALLBACK_FILE_SIZE = 1024 * 1024  # 1MB
+MMAP_MIN_SIZE = 64 * 1024  # 大于该值的文件用 mmap 读取，避免整体复制到内存
+
+# 在 bytes 与 str 下含义不同的正则构造 (单字节 vs 单字符、ASCII vs Unicode 字符类，
+# 以及 bytes 模式不支持或按单字节解释的 \u \U \N{...} \x 八进制转义)；
+# 含有这些构造的模式在解码后的文本上匹配
+_BYTES_UNSAFE_RE = re.compile(r"\.|\\[wWsSdDbBuUNx0]|\\[0-7]{3}|\[\^")
+
+MIN_LITERAL_LEN = 3  # 更短的字面量几乎所有文件都包含，预筛没有意义
+
+def _literal_runs(parsed: Any, runs: List[str]) -> bool:
+    """
+    收集解析树中必然出现的连续字面量片段 (顶层序列及非捕获/捕获分组内)。
+    遇到忽略大小写等会改变字面量含义的构造时返回 False。
+    """
+    current: List[str] = []
+    for op, av in parsed:
+        if op is sre_parse.LITERAL and chr(av) not in "\r\n":
+            current.append(chr(av))
+            continue
+        if current:
+            runs.append("".join(current))
+            current = []
+        if op is sre_parse.SUBPATTERN:
+            _, add_flags, _, sub = av
+            if add_flags & re.IGNORECASE or not _literal_runs(sub, runs):
+                return False
+    if current:
+        runs.append("".join(current))
+    return True
+
+def _required_literal(pattern: str) -> Optional[bytes]:
+    """
+    从正则中提取所有匹配都必然包含的最长字面量 (如 def\\s+foo 中的 "def" / "foo")，
+    用于在字节层面快速排除不可能匹配的文件。无法提取时返回 None。
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return None
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    runs: List[str] = []
+    if not _literal_runs(parsed, runs) or not runs:
+        return None
+    literal = max(runs, key=len).encode('utf-8')
+    return literal if len(literal) >= MIN_LITERAL_LEN else None
+
+def _exact_literal(pattern: str) -> Optional[bytes]:
+    """模式完全由普通字符组成 (无任何正则构造) 时，返回其 UTF-8 字节，否则返回 None。"""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return None
+    if not len(parsed) or parsed.state.flags & re.IGNORECASE:
+        return None
+    if any(op is not sre_parse.LITERAL or chr(av) in "\r\n" for op, av in parsed):
+        return None
+    return "".join(chr(av) for _, av in parsed).encode('utf-8')
+
+def _compile_bytes_regex(pattern: str) -> Optional["re.Pattern"]:
+    """模式为 ASCII 且在字节上语义不变时，返回等价的字节正则，否则返回 None。"""
+    if not pattern.isascii() or _BYTES_UNSAFE_RE.search(pattern):
+        return None
+    try:
+        return re.compile(pattern.encode('ascii'), re.MULTILINE)
+    except re.error:
+        # 兜底: 字节模式不接受的写法交给 str 正则处理
+        return None
+
+def _normalize_newlines(data: Any) -> Any:
+    """与文本模式的通用换行一致: \\r\\n 与单独的 \\r 都视为换行。"""
+    cr, lf = ('\r', '\n') if isinstance(data, str) else (b'\r', b'\n')
+    if cr in data:
+        data = data.replace(cr + lf, lf).replace(cr, lf)
+    return data
+
+def _scan_file(filepath: str, file_size: int, regex: "re.Pattern", bytes_regex: Optional["re.Pattern"], literal: Optional[bytes], limit: int, exact: Optional[bytes] = None) -> List[Hit]:
+    """
+    在单个文件中查找匹配行 (行号从 1 开始)，最多返回 limit 个。
+    exact 为纯字面量模式的字节串时，直接用 find 定位，不经过正则引擎。
+    """
+    # 可直接在原始字节上查找时使用的匹配器 (纯字面量优先)
+    raw_matcher = exact if exact is not None else bytes_regex
+    with open(filepath, 'rb') as f:
+        if file_size >= MMAP_MIN_SIZE:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if literal is not None and mm.find(literal) < 0:
+                    return []
+                if raw_matcher is not None and mm.find(b'\r') < 0:
+                    return _scan_buffer(filepath, mm, raw_matcher, limit)
+                data = mm[:]
+        else:
+            data = f.read()
+    if literal is not None and literal not in data:
+        return []
+    if raw_matcher is not None:
+        return _scan_buffer(filepath, _normalize_newlines(data), raw_matcher, limit)
+    # 整个文件一次性解码 (errors='ignore' 与原先的文本模式一致)，而非逐行解码
+    return _scan_buffer(filepath, _normalize_newlines(data.decode('utf-8', errors='ignore')), regex, limit)
+
+def _scan_buffer(filepath: str, data: Any, regex: Any, limit: int) -> List[Hit]:
+    """
+    在整个缓冲区 (bytes / mmap / str) 上查找候选匹配，只有命中的行才被切片和解码。
+    候选匹配可能跨行 (如 \\s 匹配换行)，因此对候选所在行 (不含换行符) 单独复核，
+    保持与 rg 相同的逐行匹配语义。
+    regex 也可以是纯字面量的 bytes: 此时用 find (C 层快速子串查找) 定位，且无需复核。
+    """
+    exact = isinstance(regex, bytes)
+    nl = '\n' if isinstance(data, str) else b'\n'
+    hits: List[Hit] = []
+    pos = 0
+    line_no = 1
+    counted = 0  # line_no 对应 data[:counted] 中的换行数
+    end = len(data)
+    while pos <= end and len(hits) < limit:
+        if exact:
+            start = data.find(regex, pos)
+            if start < 0:
+                break
+        else:
+            m = regex.search(data, pos)
+            if m is None:
+                break
+            start = m.start()
+        line_start = data.rfind(nl, 0, start) + 1
+        if line_start == end:
+            # 末尾换行之后 (或空文件) 不构成一行
+            break
+        line_end = data.find(nl, start)
+        if line_end < 0:
+            line_end = end
+        line = data[line_start:line_end]
+        if exact or regex.search(line):
+            # mmap 没有 count()，切片后计数 (只覆盖上次命中到本次之间)
+            line_no += data[counted:line_start].count(nl)
+            counted = line_start
+            if not isinstance(line, str):
+                line = line.decode('utf-8', errors='ignore')
+            hits.append((filepath, line_no, line.strip()))
+        pos = line_end + 1
+    return hits
+
+@lru_cache(maxsize=256)
+def glob_to_regex(pattern: str, match_hidden: bool = True) -> "re.Pattern":
+    """
+    将 glob 模式转换为匹配相对路径 (以 / 分隔) 的正则。
+    与 glob 模块一致: * 和 ? 不跨越目录，**/ 匹配零或多级目录。
+    match_hidden 为 False 时按 glob 的隐藏文件规则逐段判断: 只有以字面 . 开头的
+    模式段才能匹配 . 开头的名称，** 也不进入隐藏目录。
+    结果按模式缓存，重复查询不再重新翻译和编译。
+    """
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?" if match_hidden else r"(?:(?!\.)[^/]*/)*")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*" if match_hidden else r"(?:(?!\.)[^/]*/)*(?!\.)[^/]*")
+            i += 2
+            continue
+        if not match_hidden and c != "." and (i == 0 or pattern[i - 1] == "/"):
+            # 段首不是字面 . 时，该段不匹配隐藏名称
+            parts.append(r"(?!\.)")
+        if c == "*":
+            parts.append("[^/]*")
+        elif c == "?":
+            parts.append("[^/]")
+        elif c == "[":
+            j = pattern.find("]", i + 2)
+            if j < 0:
+                parts.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append("[" + body.replace("\\", "\\\\") + "]")
+                i = j
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return re.compile("".join(parts) + r"\Z", re.DOTALL)
+
+def walk_files(root: str, ignore_dirs: frozenset, include_hidden: bool = False, max_depth: Optional[int] = None) -> Iterator[os.DirEntry]:
+    """
+    基于 os.scandir 的文件遍历: 忽略目录在遍历时即被剪枝，不会进入；
+    DirEntry 自带类型信息，stat() 结果会被缓存，避免逐文件的多次系统调用。
+    max_depth 为 0 时只遍历 root 本身 (不进入子目录)。不跟随目录符号链接。
+    """
+    stack = [(root, 0)]
+    while stack:
+        directory, depth = stack.pop()
+        try:
+            it = os.scandir(directory)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if not include_hidden and entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in ignore_dirs and (max_depth is None or depth < max_depth):
+                            stack.append((entry.path, depth + 1))
+                    elif entry.is_file():
+                        yield entry
+                except OSError:
+                    continue
+
+# Python 原生搜索遍历时剪枝的目录
+IGNORE_DIRS = frozenset({".git", "venv", ".venv", "__pycache__", "node_modules", "dist", "build"})
+
+@lru_cache(maxsize=128)
+def _include_matcher(include: Optional[str]) -> Optional[Callable[[str], bool]]:
+    """
+    将 include glob 编译为相对路径匹配函数，语义与 rg -g 一致:
+    不含 / 的模式 (如 *.py) 匹配任意深度的文件名，含 / 的模式匹配相对路径。
+    匹配全部文件时返回 None。
+    """
+    if not include or include in ("*", "**", "**/*"):
+        return None
+    include = include.replace("\\", "/")
+    if include.startswith("**/") and "/" not in include[3:]:
+        include = include[3:]
+    regex = glob_to_regex(include.lstrip("/"))
+    if "/" not in include:
+        return lambda rel: regex.match(rel.rpartition("/")[2]) is not None
+    return lambda rel: regex.match(rel) is not None
+
 class RipgrepSearcher:
     """
     基于 ripgrep (rg) 的高性能代码搜索器。
@@ -12,106 +362,165 @@ class RipgrepSearcher:
     """
     def __init__(self):
         # 检查系统路径中是否存在 rg 可执行文件
-        self.rg_available = shutil.which("rg") is not None
+        self.rg_available = _RG_PATH is not None
+        # git grep 作为次级后端: 同样遵循 .gitignore，且远快于逐行 Python 扫描
+        self.git_available = _GIT_PATH is not None
         if not self.rg_available:
-            logger.warning("未检测到 ripgrep (rg)，搜索功能将降级为 Python 原生实现 (速度较慢且不支持大文件)。")
+            if self.git_available:
+                logger.warning("未检测到 ripgrep (rg)，在 git 仓库内将使用 git grep，其余情况降级为 Python 原生实现。")
+            else:
+                logger.warning("未检测到 ripgrep (rg)，搜索功能将降级为 Python 原生实现 (速度较慢且不支持大文件)。")
+        # Python 原生搜索的文件扫描线程池: 文件读取 / mmap 期间释放 GIL，多文件 I/O 可重叠
+        self.executor = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4))
 
     async def search(self, pattern: str, path: str = ".", include: str = None, context_lines: int = 0) -> str:
         """
         执行搜索的主入口。
         """
+        hits, truncated, error = await self.search_hits(pattern, path, include, context_lines)
+        if error:
+            return error
+        return format_hits(hits, truncated)
+
+    async def search_hits(self, pattern: str, path: str = ".", include: str = None, context_lines: int = 0) -> Tuple[List[Hit], bool, Optional[str]]:
+        """
+        执行搜索并返回结构化结果 (hits, truncated, error)。
+        error 不为 None 时表示搜索失败，内容为错误信息。
+        """
         if self.rg_available:
-            return self._search_with_rg(pattern, path, include, context_lines)
-        else:
-            return self._search_fallback(pattern, path, include)
+            return await self._search_with_rg(pattern, path, include, context_lines)
+        if self.git_available:
+            result = await self._search_with_git_grep(pattern, path, include)
+            if result is not None:
+                return result
+        # 在线程中运行，扫描期间不阻塞事件循环
+        return await asyncio.to_thread(self._search_fallback, pattern, path, include)
+
+    async def _search_with_git_grep(self, pattern: str, path: str, include: str) -> Optional[Tuple[List[Hit], bool, Optional[str]]]:
+        """
+        使用 git grep 搜索 (仅在 git 仓库内可用)。
+        返回 None 表示无法使用 git grep (非仓库 / 不支持 -P)，由调用方继续降级。
+        """
+        # -I: 跳过二进制文件; -P: 与 rg / Python 相同的 Perl 风格正则
+        # --untracked: 同时搜索未跟踪但未被忽略的文件，与 rg 的 .gitignore 语义一致
+        # -z: 以 NUL 分隔路径/行号/内容，避免按冒号切分的歧义
+        cmd = [_GIT_PATH, "grep", "-n", "-z", "-I", "-P", "--no-color", "--untracked", "-e", pattern]
+        cwd = path
+        if os.path.isfile(path):
+            # 搜索单个文件: 在其所在目录运行，并以文件名作为 pathspec
+            cwd = os.path.dirname(path) or "."
+            cmd.extend(["--", os.path.basename(path)])
+        elif include and include != "**/*":
+            cmd.extend(["--", include])
+        try:
+            hits, truncated, returncode, _ = await _run_streamed(cmd, cwd=cwd, parse=_parse_git_grep_z)
+        except Exception as e:
+            logger.debug(f"git grep 不可用: {e}")
+            return None
+
+        if returncode is None:
+            return hits, True, None if hits else f"Error: git grep 搜索超时 ({SEARCH_TIMEOUT}s)。"
+        if returncode == 1:
+            return [], False, None
+        if returncode != 0 and not truncated:
+            # 128: 不是 git 仓库，或 git 未编译 PCRE 支持
+            return None
+        # git grep 输出相对于 cwd 的路径，补上 path 前缀以与 rg 输出保持一致
+        return [(os.path.join(cwd, p), n, t) for p, n, t in hits], truncated, None
 
-    def _search_with_rg(self, pattern: str, path: str, include: str, context_lines: int) -> str:
+    async def _search_with_rg(self, pattern: str, path: str, include: str, context_lines: int) -> Tuple[List[Hit], bool, Optional[str]]:
         """
-        使用 subprocess 调用 rg 命令进行搜索。
+        使用异步子进程调用 rg 命令进行搜索。
+        使用 --json 输出结构化记录，无需按冒号切分文本 (Windows 路径 C:\\... 也能正确解析)。
+        context_lines > 0 时，上下文行也作为结果返回。
         """
-        # -n: 显示行号
-        # --no-heading: 不按文件分组显示文件名 (每行都带文件名，方便解析)
-        # --color=never: 禁止颜色输出
-        cmd = ["rg", "-n", "--no-heading", "--color=never"]
+        # --max-filesize: 跳过超大生成文件; --no-messages: 不输出权限等无关错误
+        cmd = [
+            _RG_PATH, "--json", "--max-filesize=10M",
+            "--mmap", "--no-messages", "-j", str(os.cpu_count() or 1),
+        ]
         
         if context_lines > 0:
             cmd.extend(["-C", str(context_lines)])
             
         if include:
-            # rg 使用 -g 参数处理 glob 模式
-            cmd.extend(["-g", include])
+            rg_type = _INCLUDE_TO_RGTYPE.get(include)
+            if rg_type:
+                cmd.append(f"--type={rg_type}")
+            else:
+                # rg 使用 -g 参数处理 glob 模式
+                cmd.extend(["-g", include])
             
-        cmd.extend([pattern, path])
+        # -e: 以 "-" 开头的模式不会被当作参数
+        cmd.extend(["-e", pattern, path])
         
         try:
             # 执行 rg 命令
-            result = subprocess.run(
-                cmd, 
-                capture_output=True, 
-                text=True, 
-                encoding='utf-8',
-                errors='replace'
-            )
+            hits, truncated, returncode, stderr = await _run_streamed(cmd, parse=_parse_rg_json)
             
-            if result.returncode == 0:
-                output = result.stdout.strip()
-                # 限制输出大小，防止上下文溢出
-                lines = output.split('\n')
-                if len(lines) > 200:
-                    return "\n".join(lines[:200]) + f"\n... (已截断，剩余 {len(lines)-200} 个匹配项)"
-                return output
-            elif result.returncode == 1:
-                return "未找到匹配项。"
-            else:
-                return f"rg 执行错误: {result.stderr}"
+            if returncode is None:
+                return hits, True, None if hits else f"Error: rg 搜索超时 ({SEARCH_TIMEOUT}s)。"
+            if truncated or returncode in (0, 1):
+                return hits, truncated, None
+            return hits, False, f"rg 执行错误: {stderr}"
         except Exception as e:
-            return f"运行 ripgrep 时发生异常: {str(e)}"
+            return [], False, f"运行 ripgrep 时发生异常: {str(e)}"
 
-    def _search_fallback(self, pattern: str, path: str, include: str = "**/*") -> str:
+    def _iter_matches(self, pattern: str, path: str, include: str = "**/*") -> Iterator[Hit]:
         """
-        Python 原生搜索实现 (Fallback)。
+        逐个产出原生搜索的命中 (按文件顺序)，由调用方决定取多少。
+        生成器关闭 (如 islice 取满后 close) 时通知工作线程停止并取消剩余任务。
         增加了文件大小检查 (MAX 1MB) 以防止 OOM。
         """
-        try:
-            regex = re.compile(pattern)
-            hits = []
-            if not include: 
-                include = "**/*"
-            
-            # 使用 glob 查找文件
-            search_files = pyglob.glob(os.path.join(path, include), recursive=True)
-            
-            for filepath in search_files:
-                if not os.path.isfile(filepath): continue
-                
-                # 过滤常见无关目录
-                if any(ignore in filepath for ignore in [".git", "venv", "__pycache__", "node_modules", "dist", "build"]):
-                    continue
-                
+        regex = re.compile(pattern, re.MULTILINE)
+        # 可安全在原始字节上匹配的模式直接搜索 bytes / mmap，非命中文件无需解码
+        bytes_regex = _compile_bytes_regex(pattern)
+        # 必然出现的字面量: 先在原始字节上做子串预筛 (C 层快速查找)，不含该子串的文件无需解码和逐行匹配
+        literal = _required_literal(pattern)
+        exact = _exact_literal(pattern)
+        
+        if os.path.isfile(path):
+            search_files = [path]
+        else:
+            # 遍历时直接剪枝无关目录，而不是先全部列出再按子串过滤
+            search_files = [entry.path for entry in walk_files(path, IGNORE_DIRS)]
+            matcher = _include_matcher(include)
+            if matcher is not None:
+                prefix_len = len(os.path.join(path, ""))
+                search_files = [f for f in search_files if matcher(f[prefix_len:].replace(os.sep, "/"))]
+        # 消费方停止拉取后通知其余工作线程直接跳过
+        done = threading.Event()
+
+        def scan(filepath: str) -> List[Hit]:
+            if done.is_set():
+                return []
+            try:
                 # 安全检查: 跳过大于 1MB 的文件
-                try:
-                    file_size = os.path.getsize(filepath)
-                    if file_size > 1024 * 1024: # 1MB
-                        continue
-                except OSError:
-                    continue
+                file_size = os.path.getsize(filepath)
+                if file_size > MAX_FALLBACK_FILE_SIZE:
+                    return []
+                return _scan_file(filepath, file_size, regex, bytes_regex, literal, MAX_FALLBACK_HITS, exact)
+            except Exception:
+                return []
 
-                # 尝试读取并匹配
-                try:
-                    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                        # 检查是否为二进制文件 (简单的启发式: 检查前 1024 字节是否有 NULL)
-                        # 这里我们用 errors='ignore' 实际上已经部分规避了，但为了性能最好还是略过
-                        # 简单起见，我们按行读取，如果遇到解码错误会被 ignore
-                        
-                        for i, line in enumerate(f, 1):
-                            if regex.search(line):
-                                hits.append(f"{filepath}:{i}: {line.strip()}")
-                                if len(hits) >= 100: break
-                except Exception:
-                    pass
-                    
-                if len(hits) >= 100: break
-                    
-            return "\n".join(hits) if hits else "未找到匹配项。"
+        # map 按文件顺序返回结果，输出与顺序扫描一致；提前结束时剩余任务被取消
+        results = self.executor.map(scan, search_files)
+        try:
+            for file_hits in results:
+                yield from file_hits
+        finally:
+            done.set()
+            results.close()
+
+    def _search_fallback(self, pattern: str, path: str, include: str = "**/*") -> Tuple[List[Hit], bool, Optional[str]]:
+        """
+        Python 原生搜索实现 (Fallback)，最多收集 MAX_FALLBACK_HITS 条命中。
+        """
+        matches = self._iter_matches(pattern, path, include)
+        try:
+            hits = list(islice(matches, MAX_FALLBACK_HITS))
+            return hits, len(hits) >= MAX_FALLBACK_HITS, None
         except Exception as e:
-            return f"执行原生搜索时发生错误: {str(e)}"
+            return [], False, f"执行原生搜索时发生错误: {str(e)}"
+        finally:
+            matches.close()
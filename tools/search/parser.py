@@ -1,6 +1,30 @@
-from typing import Optional, Tuple
+import bisect
+import functools
+import os
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 from utils.logger import logger
 
+# 常见语言的函数节点类型
+FUNCTION_NODE_TYPES = frozenset({
+    'function_definition', # python, c
+    'function_declaration', # js, ts, go, java
+    'method_declaration', # java, go
+    'arrow_function', # js, ts
+    'method_definition', # python class methods
+    'func_literal', # go
+})
+
+CLASS_NODE_TYPES = frozenset({
+    'class_definition', # python
+    'class_declaration', # js, ts, java, cpp
+    'struct_specifier', # cpp
+    'type_specifier', # go (struct)
+})
+
+# 作用域索引: (starts, ends, parents)，按起始行排序的节点行区间 (1-based)；
+# parents[i] 为包含区间 i 的最近外层区间下标 (-1 表示无)
+ScopeIndex = Tuple[List[int], List[int], List[int]]
+
 class SyntaxAwareParser:
     """
     基于 Tree-sitter 的语法感知解析器。
@@ -8,6 +32,12 @@ class SyntaxAwareParser:
     """
     def __init__(self):
         self.available = False
+        # 解析结果缓存: 键包含 mtime/size，文件被修改后自动失效；同一文件的多个命中只解析一次
+        self._parse_cached = functools.lru_cache(maxsize=256)(self._parse)
+        # 每个文件版本、每类节点只遍历一次语法树，之后每个命中行只需一次二分查找
+        self._scope_index_cached = functools.lru_cache(maxsize=256)(self._build_scope_index)
+        # 每种语言的 Parser 只创建一次 (get_parser 每次调用都会新建对象)
+        self._parsers: Dict[str, Any] = {}
         try:
             from tree_sitter_languages import get_language, get_parser
             self.get_language = get_language
@@ -18,8 +48,35 @@ class SyntaxAwareParser:
             logger.warning(f"Tree-sitter 初始化失败: {e} (Smart Search 的 Scope Expansion 功能将不可用)")
             pass
             
-    def _get_node_scope(self, file_path: str, line_number: int, node_types: list) -> Optional[Tuple[int, int]]:
-        """查找特定类型节点的范围的通用辅助方法。"""
+    def _parse(self, file_path: str, lang_id: str, mtime_ns: int, size: int) -> Any:
+        """读取并解析文件，返回语法树 (mtime_ns/size 仅用作缓存键)。"""
+        parser = self._parsers.get(lang_id)
+        if parser is None:
+            parser = self._parsers[lang_id] = self.get_parser(lang_id)
+        with open(file_path, "rb") as f:
+            source_code = f.read()
+        return parser.parse(source_code)
+
+    def _build_scope_index(self, file_path: str, lang_id: str, mtime_ns: int, size: int, node_types: FrozenSet[str]) -> ScopeIndex:
+        """一次深度优先遍历，收集所有 node_types 节点的行区间及其嵌套关系。"""
+        tree = self._parse_cached(file_path, lang_id, mtime_ns, size)
+        starts: List[int] = []
+        ends: List[int] = []
+        parents: List[int] = []
+        # 栈元素: (节点, 最近外层目标节点的下标)；先序遍历保证 starts 有序
+        stack = [(tree.root_node, -1)]
+        while stack:
+            node, parent = stack.pop()
+            if node.type in node_types:
+                starts.append(node.start_point[0] + 1)
+                ends.append(node.end_point[0] + 1)
+                parents.append(parent)
+                parent = len(starts) - 1
+            stack.extend((child, parent) for child in reversed(node.children))
+        return starts, ends, parents
+
+    def _get_node_scope(self, file_path: str, line_number: int, node_types: FrozenSet[str]) -> Optional[Tuple[int, int]]:
+        """查找包含指定行的最内层特定类型节点的范围的通用辅助方法。"""
         if not self.available:
             return None
             
@@ -28,30 +85,16 @@ class SyntaxAwareParser:
             return None
             
         try:
-            language = self.get_language(lang_id)
-            parser = self.get_parser(lang_id)
-            
-            with open(file_path, "rb") as f:
-                source_code = f.read()
-            
-            tree = parser.parse(source_code)
-            root_node = tree.root_node
-            
-            # Tree-sitter 使用 0-based 索引，用户输入为 1-based
-            target_line = line_number - 1
-            
-            # 找到覆盖该行的最小节点
-            # 启发式: 使用 point_range 查询
-            # 注意: 这里假设 target_line 在文件范围内
-            
-            target_node = root_node.named_descendant_for_point_range((target_line, 0), (target_line, 0))
+            st = os.stat(file_path)
+            starts, ends, parents = self._scope_index_cached(file_path, lang_id, st.st_mtime_ns, st.st_size, node_types)
             
-            # 向上遍历以找到符合 node_types 的最近闭包
-            current = target_node
-            while current:
-                if current.type in node_types:
-                    return (current.start_point.row + 1, current.end_point.row + 1)
-                current = current.parent
+            # 起始行 <= line_number 的最后一个区间；若它已在该行之前结束，
+            # 则沿外层区间向上查找 (嵌套深度通常很小)
+            i = bisect.bisect_right(starts, line_number) - 1
+            while i >= 0:
+                if ends[i] >= line_number:
+                    return (starts[i], ends[i])
+                i = parents[i]
                 
             return None
             
@@ -82,25 +125,10 @@ class SyntaxAwareParser:
         """
         返回包含指定行号的函数的 (start_line, end_line)。
         """
-        # 常见语言的函数节点类型
-        func_types = [
-            'function_definition', # python, c
-            'function_declaration', # js, ts, go, java
-            'method_declaration', # java, go
-            'arrow_function', # js, ts
-            'method_definition', # python class methods
-            'func_literal', # go
-        ]
-        return self._get_node_scope(file_path, line_number, func_types)
+        return self._get_node_scope(file_path, line_number, FUNCTION_NODE_TYPES)
 
     def get_class_scope(self, file_path: str, line_number: int) -> Optional[Tuple[int, int]]:
         """
         返回包含指定行号的类的 (start_line, end_line)。
         """
-        class_types = [
-            'class_definition', # python
-            'class_declaration', # js, ts, java, cpp
-            'struct_specifier', # cpp
-            'type_specifier', # go (struct)
-        ]
-        return self._get_node_scope(file_path, line_number, class_types)
+        return self._get_node_scope(file_path, line_number, CLASS_NODE_TYPES)
@@ -2,6 +2,13 @@
 # 该库为不同编程语言的常见代码搜索场景提供优化的正则表达式。
 # 通过使用这些模板，用户只需提供关键词，无需编写复杂的正则。
 
+import functools
+import re
+from typing import Dict, Optional, Tuple
+from utils.logger import logger
+
+PLACEHOLDER = "{pattern}"
+
 REGEX_TEMPLATES = {
     "python": {
         "def": r"def\s+{pattern}",            # 函数定义
@@ -97,7 +104,27 @@ REGEX_TEMPLATES = {
     },
 }
 
-def get_template(lang: str, template_name: str) -> str:
+# (lang, template_name) -> 模板，导入时展开一次，查找只需一次字典访问
+_TEMPLATE_INDEX: Dict[Tuple[str, str], str] = {
+    (lang, name): tpl
+    for lang, templates in REGEX_TEMPLATES.items()
+    for name, tpl in templates.items()
+}
+
+def _validate_templates():
+    """导入时校验所有模板 (含占位符且为合法正则)，而不是在每次搜索时才发现问题。"""
+    for (lang, name), tpl in _TEMPLATE_INDEX.items():
+        if PLACEHOLDER not in tpl:
+            logger.warning(f"搜索模板 {lang}.{name} 缺少 {PLACEHOLDER} 占位符")
+            continue
+        try:
+            re.compile(tpl.replace(PLACEHOLDER, "x"))
+        except re.error as e:
+            logger.warning(f"搜索模板 {lang}.{name} 不是合法正则: {e}")
+
+_validate_templates()
+
+def get_template(lang: str, template_name: str) -> Optional[str]:
     """
     根据语言和场景获取正则表达式模板。
     
@@ -108,6 +135,16 @@ def get_template(lang: str, template_name: str) -> str:
     Returns:
         str: 格式化前的正则模板字符串，如果未找到则返回 None
     """
-    if lang in REGEX_TEMPLATES and template_name in REGEX_TEMPLATES[lang]:
-        return REGEX_TEMPLATES[lang][template_name]
-    return None
+    return _TEMPLATE_INDEX.get((lang, template_name))
+
+@functools.lru_cache(maxsize=512)
+def build_pattern(lang: str, template_name: str, query: str) -> Optional[str]:
+    """
+    将查询代入模板，得到最终的搜索正则；相同的 (lang, template, query) 直接复用结果。
+    未找到模板时返回 None。
+    """
+    tpl = get_template(lang, template_name)
+    if tpl is None:
+        return None
+    # 使用 replace 而非 str.format: 部分模板自身包含正则的花括号 (如 \{)
+    return tpl.replace(PLACEHOLDER, query)
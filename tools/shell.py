@@ -1,8 +1,35 @@
 import asyncio
-import subprocess
+import locale
 import platform
+import re
 from tools.base import registry
 
+_IS_WINDOWS = platform.system() == "Windows"
+_SYSTEM_ENCODING = locale.getpreferredencoding()
+# 含这些字符（管道、重定向、变量、通配、引号、换行等）时必须交给 shell 解释
+_SHELL_META_RE = re.compile(r"[|&;<>()$`\\\"'*?\[\]{}~=#!\n]")
+# shell 内建命令没有可执行文件，直接 exec 会失败或语义不同
+_SHELL_BUILTINS = frozenset({
+    "cd", "export", "source", ".", "alias", "unalias", "set", "unset",
+    "exit", "exec", "eval", "type", "ulimit", "umask", "history",
+})
+
+def _exec_argv(cmd: str):
+    """Return argv when cmd can run without a shell, else None."""
+    if _IS_WINDOWS or _SHELL_META_RE.search(cmd):
+        return None
+    argv = cmd.split()
+    if not argv or argv[0] in _SHELL_BUILTINS:
+        return None
+    return argv
+
+def _decode(data: bytes) -> str:
+    # Decode strategy: Try system encoding first (Windows GBK), then UTF-8
+    try:
+        return data.decode(_SYSTEM_ENCODING)
+    except UnicodeDecodeError:
+        return data.decode('utf-8', errors='replace')
+
 @registry.register(
     name="bash",
     description="Execute a shell command (bash/cmd/powershell).",
@@ -14,44 +41,36 @@ from tools.base import registry
     }
 )
 async def run_shell(cmd: str) -> str:
-    # Determine shell based on OS
-    shell = True
-    if platform.system() == "Windows":
-        # On Windows, we might want to prefix with powershell or cmd if needed
-        # But subprocess with shell=True defaults to cmd.exe usually.
-        # Let's try to run as is.
-        pass
-    
     try:
-        proc = await asyncio.create_subprocess_shell(
-            cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        # 简单命令直接 exec，省去一次 /bin/sh fork+exec；找不到可执行文件时退回 shell
+        proc = None
+        argv = _exec_argv(cmd)
+        if argv is not None:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *argv,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+            except (FileNotFoundError, PermissionError):
+                proc = None
+        if proc is None:
+            proc = await asyncio.create_subprocess_shell(
+                cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
         
         try:
             stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=30)
         except asyncio.TimeoutError:
             proc.kill()
             return "Error: Command timed out after 30s."
-            
-        # Decode strategy: Try system encoding first (Windows GBK), then UTF-8
-        import locale
-        system_encoding = locale.getpreferredencoding()
-        
-        try:
-            output = stdout.decode(system_encoding)
-        except UnicodeDecodeError:
-            output = stdout.decode('utf-8', errors='replace')
-            
-        try:
-            error = stderr.decode(system_encoding)
-        except UnicodeDecodeError:
-            error = stderr.decode('utf-8', errors='replace')
         
-        result = output
-        if error:
-            result += f"\nSTDERR:\n{error}"
+        # stdout / stderr 分别解码: 一侧的非法字节不会让另一侧也退回 UTF-8 替换解码
+        result = _decode(stdout)
+        if stderr:
+            result += f"\nSTDERR:\n{_decode(stderr)}"
             
         if not result.strip():
             return "(Command executed with no output)"
@@ -1,6 +1,14 @@
+from contextvars import ContextVar
 from tools.base import registry
 from core.task import TaskManager
-from typing import Any
+
+# 每个会话 (asyncio Task) 各自绑定 TaskManager；子任务创建时自动继承
+_TASK_MANAGER: ContextVar[TaskManager] = ContextVar("task_manager")
+_NO_MANAGER = "Error: No task manager bound to the current session."
+
+def bind_task_manager(manager: TaskManager):
+    """Bind manager to the current context; returns the reset token."""
+    return _TASK_MANAGER.set(manager)
 
 @registry.register(
     name="todo_add",
@@ -12,11 +20,10 @@ from typing import Any
         "required": ["content"]
     }
 )
-def todo_add(content: str, context: Any) -> str:
-    if not hasattr(context, 'task_manager'):
-        return "Error: Invalid context (missing task_manager)."
-    
-    manager: TaskManager = context.task_manager
+def todo_add(content: str) -> str:
+    manager = _TASK_MANAGER.get(None)
+    if manager is None:
+        return _NO_MANAGER
     task_id = manager.add_task(content)
     manager.print_summary()
     return f"Task added with ID: {task_id}"
@@ -32,11 +39,10 @@ def todo_add(content: str, context: Any) -> str:
         "required": ["task_id", "status"]
     }
 )
-def todo_update(task_id: str, status: str, context: Any) -> str:
-    if not hasattr(context, 'task_manager'):
-        return "Error: Invalid context (missing task_manager)."
-        
-    manager: TaskManager = context.task_manager
+def todo_update(task_id: str, status: str) -> str:
+    manager = _TASK_MANAGER.get(None)
+    if manager is None:
+        return _NO_MANAGER
     if manager.update_task(task_id, status):
         manager.print_summary()
         return f"Task {task_id} updated to {status}."
@@ -50,9 +56,8 @@ def todo_update(task_id: str, status: str, context: Any) -> str:
         "required": []
     }
 )
-def todo_list(context: Any) -> str:
-    if not hasattr(context, 'task_manager'):
-        return "Error: Invalid context (missing task_manager)."
-        
-    manager: TaskManager = context.task_manager
+def todo_list() -> str:
+    manager = _TASK_MANAGER.get(None)
+    if manager is None:
+        return _NO_MANAGER
     return manager.render()
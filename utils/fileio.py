@@ -0,0 +1,44 @@
+import asyncio
+import os
+
+# Whole-file helpers for small files: the blocking open+read/write runs in a
+# single worker-thread hop, instead of one threadpool dispatch per aiofiles call.
+
+
+def _read_text(path: str, encoding: str) -> str:
+    with open(path, "r", encoding=encoding) as f:
+        return f.read()
+
+
+def _write_text(path: str, data: str, encoding: str) -> None:
+    with open(path, "w", encoding=encoding) as f:
+        f.write(data)
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def read_text(path: str, encoding: str = "utf-8") -> str:
+    return await asyncio.to_thread(_read_text, path, encoding)
+
+
+async def write_text(path: str, data: str, encoding: str = "utf-8") -> None:
+    await asyncio.to_thread(_write_text, path, data, encoding)
+
+
+async def read_bytes(path: str) -> bytes:
+    return await asyncio.to_thread(_read_bytes, path)
+
+
+def _replace_bytes(path: str, data: bytes) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+async def replace_bytes(path: str, data: bytes) -> None:
+    """Atomically replace path: write a sibling temp file, then os.replace it in."""
+    await asyncio.to_thread(_replace_bytes, path, data)
@@ -1,25 +1,102 @@
 from rich.console import Console
 from rich.logging import RichHandler
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener
+import atexit
 import logging
+import logging.config
+import os
+import queue
+import sys
 
 console = Console()
 
+# 输出被重定向到文件/CI 日志或终端不支持时不使用 Rich，ANSI 标记在这些场景下既无用又慢
+USE_RICH = (
+    sys.stdout.isatty()
+    and os.environ.get("TERM") != "dumb"
+    and not os.environ.get("NO_COLOR")
+)
+
+class _BatchingQueueListener(QueueListener):
+    """
+    批量输出的 QueueListener: 队列中有积压时记录先进入 MemoryHandler 缓冲，
+    队列一旦排空就立即 flush，因此空闲时不会有日志滞留 (无需定时器)。
+    """
+    def dequeue(self, block):
+        if block:
+            try:
+                return self.queue.get_nowait()
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+        return self.queue.get(block)
+
 def setup_logger(debug=False):
-    logging.basicConfig(
-        level="INFO" if debug else "WARNING", # Global default to WARNING to keep it quiet
-        format="%(message)s",
-        datefmt="[%X]",
-        handlers=[RichHandler(console=console, markup=True)]
+    # 调用方只把日志记录放入队列；格式化和终端输出由单独的监听线程完成
+    log_queue = queue.SimpleQueue()
+    # 一次 dictConfig 完成全部配置 (root 级别/handler、第三方库降噪、本项目 logger)
+    logging.config.dictConfig({
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "plain": {"format": "%(message)s", "datefmt": "[%X]"},
+        },
+        "handlers": {
+            "queue": {"()": QueueHandler, "queue": log_queue, "formatter": "plain"},
+        },
+        "loggers": {
+            # Suppress noisy libraries even if global level is INFO
+            "httpx": {"level": "WARNING"},
+            "httpcore": {"level": "WARNING"},
+            # 本项目 logger 默认 WARNING (被丢弃的 INFO 不再付出格式化开销)，可用 ECA_LOG_LEVEL 调整
+            "easy_coding_agent": {"level": os.getenv("ECA_LOG_LEVEL") or ("INFO" if debug else "WARNING")},
+        },
+        "root": {
+            "level": "INFO" if debug else "WARNING", # Global default to WARNING to keep it quiet
+            "handlers": ["queue"],
+        },
+    })
+
+    # 注意: 需在 dictConfig 之后创建，dictConfig 会关闭此前已存在的 handler
+    if USE_RICH:
+        # 默认不解析 markup、不显示调用位置 (省去逐条 BBCode 扫描)；
+        # 个别需要样式的记录可用 logger.info("[bold]...", extra={"markup": True}) 单独开启
+        output_handler = RichHandler(
+            console=console,
+            markup=False,
+            show_path=False,
+            rich_tracebacks=False,
+            keywords=[],
+            log_time_format="[%X]"
+        )
+        output_handler.setFormatter(logging.Formatter("%(message)s"))
+    else:
+        output_handler = logging.StreamHandler(sys.stdout)
+        output_handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    # INFO 记录攒满 64 条或出现 WARNING 及以上时才一次性交给输出 handler
+    buffer_handler = MemoryHandler(
+        capacity=64,
+        flushLevel=logging.WARNING,
+        target=output_handler,
+        flushOnClose=True
     )
+    listener = _BatchingQueueListener(log_queue, buffer_handler, respect_handler_level=True)
+    listener.start()
+
+    def _shutdown():
+        # 退出时排空队列并 flush 缓冲，保证最后的日志被输出
+        listener.stop()
+        buffer_handler.flush()
+    atexit.register(_shutdown)
     
-    # Suppress noisy libraries even if global level is INFO
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-    logging.getLogger("httpcore").setLevel(logging.WARNING)
-    
-    # Set our own logger to INFO so we can see our own messages
-    logger = logging.getLogger("easy_coding_agent")
-    logger.setLevel(logging.INFO)
-    
-    return logger
+    return logging.getLogger("easy_coding_agent")
 
 logger = setup_logger()
+
+def linfo(msg_factory):
+    """
+    热路径使用的惰性 INFO 日志: 仅在 INFO 级别启用时才调用 msg_factory 生成消息，
+    例如 linfo(lambda: f"...")，级别关闭时省去字符串格式化。
+    """
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(msg_factory(), stacklevel=2)
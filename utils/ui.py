@@ -1,12 +1,10 @@
+import io
 import platform
 import random
 import os
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
-from rich import box
-from rich.text import Text
-from core.config import Config
+import sys
+from functools import cache, lru_cache
+from itertools import zip_longest
 
 # ASCII Art Logo for "ECA" (Easy Coding Agent)
 LOGO = """
@@ -17,71 +15,131 @@ LOGO = """
 ███████╗╚██████╗██║   ██║
 ╚══════╝ ╚═════╝╚═╝   ╚═╝
 """
+# OS 信息在进程内不会变化，导入时取一次 (platform.release() 需要系统调用)
+_OS_STRING = f"{platform.system()} {platform.release()}"
+
+# 预先加好 bold green 的 ANSI 版本，纯字符串常量，导入时不依赖 Rich
+LOGO_ANSI = f"\x1b[1;32m{LOGO}\x1b[0m"
+
+@cache
+def _rich():
+    """
+    延迟导入 Rich: 只有渲染启动画面时才需要，仅导入 LOGO / get_random_tip 的代码路径
+    不必承担 Rich 的导入开销。
+    """
+    from rich.console import Console
+    from rich.panel import Panel
+    from rich import box
+    from rich.text import Text
+    return Console, Panel, box, Text
+
+@cache
+def _splash_constants():
+    """启动画面用到的不变量 (LOGO_TEXT, MODEL_SHORT)，首次渲染时构建一次。"""
+    from core.config import Config
+    Text = _rich()[-1]
+    LOGO_TEXT = Text.from_ansi(LOGO_ANSI)
+    MODEL_SHORT = Config.MODEL_NAME.split("/")[-1] # Shorten model name
+    return LOGO_TEXT, MODEL_SHORT
+
+_TIPS = (
+    "💡 Press [bold]Shift+Tab[/bold] to toggle modes (Plan/Code/Chat).",
+    "💡 Use [bold]/exit[/bold] to quit the application.",
+    "💡 Files created are stored in [bold]workspace/[/bold] by default.",
+    "💡 I automatically manage memory to keep context relevant.",
+    "💡 Use [bold]manage_core_memory[/bold] to save reusable rules.",
+    "💡 In Plan Mode, I can help you architect before coding.",
+)
+_RNG = random.Random()
 
 def get_random_tip():
-    tips = [
-        "💡 Press [bold]Shift+Tab[/bold] to toggle modes (Plan/Code/Chat).",
-        "💡 Use [bold]/exit[/bold] to quit the application.",
-        "💡 Files created are stored in [bold]workspace/[/bold] by default.",
-        "💡 I automatically manage memory to keep context relevant.",
-        "💡 Use [bold]manage_core_memory[/bold] to save reusable rules.",
-        "💡 In Plan Mode, I can help you architect before coding.",
-    ]
-    return random.choice(tips)
+    return _RNG.choice(_TIPS)
 
-def render_splash_screen():
-    """Renders the startup splash screen similar to Claude Code."""
-    console = Console()
-    console.clear()
-    
-    # Left Side: Info & Logo
-    left_table = Table.grid(padding=0)
-    left_table.add_column(justify="left")
-    
-    logo_text = Text(LOGO, style="bold green")
-    left_table.add_row(logo_text)
-    left_table.add_row(Text("Easy Coding Agents", style="bold white on green"))
-    left_table.add_row("")
+# 启动画面布局固定: 左栏 (Logo + 环境信息) 与右栏 (Tips 框) 之间的间距，以及 Tips 框宽度范围
+_SPLASH_GAP = 4
+_TIPS_MAX_WIDTH = 50
+_TIPS_MIN_WIDTH = 30
+# 外框边线 (2) + 左右内边距 (2 * 2)
+_OUTER_CHROME = 6
+
+def _splash_left_lines(model: str, api: str, os_str: str) -> list:
+    """Left column: logo, title and right-aligned environment labels, one Text per line."""
+    Text = _rich()[-1]
+    LOGO_TEXT = _splash_constants()[0]
+    lines = LOGO_TEXT.split("\n", allow_blank=True)
+    lines.append(Text("Easy Coding Agents", style="bold white on green"))
+    lines.append(Text(""))
     
     # Environment Info
-    info_table = Table.grid(padding=(0, 1))
-    info_table.add_column(style="dim", justify="right")
-    info_table.add_column(style="cyan")
-    
-    info_table.add_row("Model:", Config.MODEL_NAME.split("/")[-1]) # Shorten model name
-    info_table.add_row("API:", Config.provider_label())
-    info_table.add_row("OS:", f"{platform.system()} {platform.release()}")
-    
-    left_table.add_row(info_table)
-    
-    # Right Side: Tips
-    right_table = Table.grid(padding=1)
-    
-    tips_panel = Panel(
-        get_random_tip(),
-        title="[bold]Tips for getting started[/bold]",
-        border_style="cyan",
-        box=box.ROUNDED,
-        padding=(1, 2),
-        width=50
+    info = (("Model:", model), ("API:", api), ("OS:", os_str))
+    label_width = max(len(label) for label, _ in info)
+    for label, value in info:
+        lines.append(Text.assemble((label.rjust(label_width), "dim"), " ", (value, "cyan")))
+    return list(lines)
+
+def _tips_box_lines(tip: str, width: int, console) -> list:
+    """Right column: the tips box drawn with rounded box characters, one Text per line."""
+    _, _, box, Text = _rich()
+    box = box.ROUNDED
+    title = "Tips for getting started"
+    inner = width - 2
+    fill = inner - len(title) - 2
+    left_fill = fill // 2
+    top = Text.assemble(
+        (box.top_left + box.top * left_fill + " ", "cyan"),
+        (title, "bold cyan"),
+        (" " + box.top * (fill - left_fill) + box.top_right, "cyan")
+    )
+    # padding=(1, 2): 上下各空一行，左右各空两格
+    body_width = inner - 4
+    blank = Text.assemble((box.mid_left, "cyan"), " " * inner, (box.mid_right, "cyan"))
+    lines = [top, blank]
+    for line in Text.from_markup(tip).wrap(console, body_width):
+        line.align("left", body_width)
+        lines.append(Text.assemble((box.mid_left, "cyan"), "  ", line, "  ", (box.mid_right, "cyan")))
+    lines.append(blank.copy())
+    lines.append(Text(box.bottom_left + box.bottom * inner + box.bottom_right, style="cyan"))
+    return lines
+
+@lru_cache(maxsize=8)
+def _build_splash_ansi(model: str, api: str, os_str: str, tip: str, cwd: str, width: int, color_system) -> str:
+    """
+    渲染完整的启动画面并返回 ANSI 字符串。
+    输入几乎不变，按参数缓存后重复显示只需一次写出，无需重新排版。
+    两栏内容按固定宽度直接拼成行，只有最外层用一个 Panel 渲染边框。
+    """
+    Console, Panel, box, Text = _rich()
+    console = Console(
+        file=io.StringIO(),
+        record=True,
+        width=width,
+        color_system=color_system,
+        force_terminal=color_system is not None
     )
-    right_table.add_row(tips_panel)
-    
-    # Recent Activity (Placeholder)
-    # right_table.add_row(Text("\nRecent Activity:", style="dim"))
-    # right_table.add_row(Text("No recent activity", style="dim italic"))
     
-    # Main Layout Table
-    main_grid = Table.grid(padding=(0, 4))
-    main_grid.add_column()
-    main_grid.add_column(justify="center") # Vertical center the right side? No, table row alignment.
+    left_lines = _splash_left_lines(model, api, os_str)
+    left_width = max(line.cell_len for line in left_lines)
+    # Tips 框在终端放不下时收窄；窄到最小宽度仍放不下时改为排在左栏下方
+    side_width = width - _OUTER_CHROME - left_width - _SPLASH_GAP
+    if side_width >= _TIPS_MIN_WIDTH:
+        right_lines = _tips_box_lines(tip, min(_TIPS_MAX_WIDTH, side_width), console)
+    else:
+        left_lines.append(Text(""))
+        left_lines.extend(_tips_box_lines(tip, max(_TIPS_MIN_WIDTH, min(_TIPS_MAX_WIDTH, width - _OUTER_CHROME)), console))
+        left_width = max(line.cell_len for line in left_lines)
+        right_lines = []
     
-    # Add content
-    main_grid.add_row(left_table, right_table)
+    gap = " " * _SPLASH_GAP
+    rows = []
+    for left, right in zip_longest(left_lines, right_lines, fillvalue=None):
+        # 左栏补齐到固定宽度 (与原先表格单元格一致，样式随行延伸)
+        left = left.copy() if left is not None else Text("")
+        left.align("left", left_width)
+        rows.append(Text.assemble(left, gap, right) if right is not None else left)
     
     # Outer Panel
     outer_panel = Panel(
-        main_grid,
+        Text("\n", justify="left").join(rows),
         title="[bold green]Welcome back![/bold green]",
         subtitle="[dim]Easy Coding Agents v2.0[/dim]",
         border_style="green",
@@ -91,5 +149,30 @@ def render_splash_screen():
     )
     
     console.print(outer_panel, justify="center")
-    console.print(f"[dim]Working Directory: {os.getcwd()}[/dim]", justify="center")
-    console.print("")
+    console.print(f"[dim]Working Directory: {cwd}[/dim]\n", justify="center")
+    return console.export_text(styles=color_system is not None)
+
+def render_splash_screen():
+    """Renders the startup splash screen similar to Claude Code."""
+    from core.config import Config
+    from utils.logger import USE_RICH, console
+    if not USE_RICH:
+        # 非终端 (管道/CI) 或 dumb 终端只输出一行纯文本，不加载 Rich 排版
+        print(f"ECA v2.0 | {Config.MODEL_NAME.split('/')[-1]} | {Config.provider_label()}")
+        return
+    MODEL_SHORT = _splash_constants()[1]
+    # 复用全局 Console (终端探测只做一次)；缓存的画面由独立的离屏 Console 渲染
+    frame = _build_splash_ansi(
+        MODEL_SHORT,
+        Config.provider_label(),
+        _OS_STRING,
+        get_random_tip(),
+        os.getcwd(),
+        console.width,
+        console.color_system
+    )
+    # 清屏控制码与缓存的画面拼接后一次性写出并 flush
+    with console.capture() as capture:
+        console.clear()
+    sys.stdout.write(capture.get() + frame)
+    sys.stdout.flush()